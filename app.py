@@ -13,6 +13,7 @@ NOTE: If Python not added to PATH use python -m flask run
 """
 
 # ----- 3RD PARTY IMPORTS -----
+import click
 from dotenv import load_dotenv, set_key
 from flask import Flask
 from flask.logging import default_handler
@@ -24,6 +25,7 @@ from logging.handlers import RotatingFileHandler
 
 # ----- PROJECT IMPORTS -----
 from extensions import db, login_manager, ma
+from migrations import upgrade_database
 from models import *
 
 dotenv_path = os.path.join(os.getcwd(), 'instance\\.env')
@@ -37,12 +39,17 @@ def create_app() -> Flask:
     # setup_loggers(app)
     load_settings(app)
     register_blueprints(app)
+    register_commands(app)
     initialize_addons(app)
+    configure_burk_api(app)
+    configure_report_cache(app)
 
-    # Creates SQL tables in db for any imported models
+    # Creates SQL tables in db for any imported models, then brings existing tables up to date
     with app.app_context():
         db.create_all()
+        upgrade_database(db.engine, log=app.logger.info)
 
+    start_background_tasks(app)
     return app
 
 
@@ -128,6 +135,17 @@ def register_blueprints(app: Flask) -> None:
     return
 
 
+def register_commands(app: Flask) -> None:
+    """ Adds maintenance commands to the flask CLI """
+    from commands import (backfill_site_readings_command, generate_reports_command, rebuild_rollups_command,
+                          upgrade_database_command)
+    app.cli.add_command(backfill_site_readings_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(upgrade_database_command)
+    app.cli.add_command(generate_reports_command)
+    return
+
+
 def initialize_addons(app: Flask) -> None:
     """ Register Flask add-ons with the app """
     db.init_app(app)
@@ -143,6 +161,44 @@ def initialize_addons(app: Flask) -> None:
     return
 
 
+def configure_burk_api(app: Flask) -> None:
+    """ Apply FLASK_BURK_* settings to the pooled Burk sessions, snapshot cache, site health tracking and live feed """
+    from utils.arcplus import sessions
+    from utils.burk_cache import snapshot_cache
+    from utils.burk_health import site_health
+    from utils.live_feed import live_feed
+    sessions.configure(app.config)
+    snapshot_cache.configure(app.config)
+    site_health.configure(app.config)
+    live_feed.configure(app.config)
+    return
+
+
+def configure_report_cache(app: Flask) -> None:
+    """ Apply FLASK_REPORT_* settings to the rendered PDF report cache and the background report jobs """
+    from utils.tasks import report_cache, report_jobs
+    report_cache.configure(app.config, app.instance_path)
+    report_jobs.configure(app.config, app.instance_path)
+    return
+
+
+def start_background_tasks(app: Flask) -> None:
+    """ Start tasks that run alongside the web app, not in commands such as flask generate-reports """
+    if not serving_requests():
+        return
+    from utils.tasks import start_telemetry_sampler
+    start_telemetry_sampler(app)
+    return
+
+
+def serving_requests() -> bool:
+    """ True under waitress or flask run, False when the app is loaded for another flask CLI command """
+    if os.environ.get('FLASK_RUN_FROM_CLI') != 'true':
+        return True
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.command.name == 'run'
+
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True)
@@ -0,0 +1,7 @@
+"""
+Commands dir defines Flask CLI commands for maintenance tasks
+Run with flask <command-name> from the project directory
+"""
+
+from commands.database import backfill_site_readings_command, rebuild_rollups_command, upgrade_database_command
+from commands.reports import generate_reports_command
@@ -0,0 +1,40 @@
+""" CLI commands that maintain derived database tables """
+# ----- 3RD PARTY IMPORTS -----
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('backfill-site-readings')
+@with_appcontext
+def backfill_site_readings_command() -> None:
+    """ Index existing readings by the sites that have values in them """
+    from utils.reading_index import backfill_site_readings
+    added = backfill_site_readings()
+    click.echo(f'Indexed {added} site readings')
+
+
+@click.command('rebuild-rollups')
+@click.option('--site', 'site_id', type=int, default=None, help='Only rebuild the channels of this site id')
+@with_appcontext
+def rebuild_rollups_command(site_id: int) -> None:
+    """ Recompute daily meter rollups from raw reading values using current meter limits """
+    from utils.rollups import rebuild_daily_rollups
+    written = rebuild_daily_rollups(site_id)
+    click.echo(f'Wrote {written} daily rollups')
+
+
+@click.command('upgrade-db')
+@click.option('--status', is_flag=True, help='List pending migrations without applying them')
+@with_appcontext
+def upgrade_database_command(status: bool) -> None:
+    """ Apply pending schema migrations to the configured database """
+    from extensions import db
+    from migrations import pending_migrations, upgrade_database
+    if status:
+        pending = pending_migrations(db.engine)
+        for migration in pending:
+            click.echo(f'Pending migration {migration.version}: {migration.description}')
+        click.echo(f'{len(pending)} pending migrations')
+        return
+    applied = upgrade_database(db.engine, log=click.echo)
+    click.echo(f'Applied {applied} migrations')
@@ -0,0 +1,68 @@
+""" CLI commands that render reports outside of a request """
+# ----- 3RD PARTY IMPORTS -----
+import click
+from flask.cli import with_appcontext
+# ----- BUILT IN IMPORTS -----
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+
+@click.command('generate-reports')
+@click.option('--start', 'start_date', required=True, type=click.DateTime(['%Y-%m-%d']), help='First day, YYYY-MM-DD')
+@click.option('--end', 'end_date', required=True, type=click.DateTime(['%Y-%m-%d']), help='Last day, YYYY-MM-DD')
+@click.option('--site', 'site_ids', type=int, multiple=True, help='Site id to report on, repeat for more, default all')
+@click.option('--output', default='reports', type=click.Path(file_okay=False), help='Directory the PDFs are written to')
+@click.option('--workers', default=os.cpu_count(), type=int, help='Worker processes rendering reports')
+@with_appcontext
+def generate_reports_command(start_date: datetime, end_date: datetime, site_ids: tuple, output: str,
+                             workers: int) -> None:
+    """ Render the PDF report of every site, or the chosen sites, over whole days from start to end """
+    from models import Site
+    from utils.tasks.report_data import gather_sites_report_data
+
+    date_range = (start_date, end_date + timedelta(hours=23, minutes=59, seconds=59))
+    query = Site.query.order_by(Site.site_order.asc())
+    if site_ids:
+        query = query.filter(Site.id.in_(site_ids))
+    sites = query.all()
+    if not sites:
+        raise click.ClickException('No sites to report on')
+    os.makedirs(output, exist_ok=True)
+
+    started = time.perf_counter()
+    reports = gather_sites_report_data(sites, date_range)
+    click.echo(f'Fetched data of {len(sites)} sites in {time.perf_counter() - started:.2f} s')
+
+    # spawned workers do not inherit the app's database connections
+    render_time = 0.0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {}
+        for site_data in reports:
+            filename = (f"{start_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}_"
+                        f"{site_data.site_name}_report.pdf")
+            futures[pool.submit(render_report_file, site_data, os.path.join(output, filename))] = site_data
+        for future in as_completed(futures):
+            site_data = futures[future]
+            try:
+                seconds, path = future.result()
+            except Exception as err:
+                click.echo(f'{site_data.site_name}: failed, {err}')
+                continue
+            render_time += seconds
+            click.echo(f'{site_data.site_name}: {seconds:.2f} s -> {path}')
+
+    elapsed = time.perf_counter() - started
+    click.echo(f'{len(reports)} reports in {elapsed:.2f} s, {render_time:.2f} s of rendering across {workers} workers')
+
+
+def render_report_file(site_data, path: str):
+    """ Runs in a worker process, returns (seconds spent rendering, path written) """
+    from utils.tasks.pdf_generation import build_pdf
+    started = time.perf_counter()
+    pdf_data = build_pdf(site_data)
+    with open(path, 'wb') as file:
+        file.write(pdf_data)
+    return time.perf_counter() - started, path
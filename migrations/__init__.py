@@ -0,0 +1,9 @@
+"""
+Migrations dir holds versioned changes to the database schema
+db.create_all only creates missing tables, so anything added to an existing table is applied from here
+Applied versions are recorded in the schema_migrations table
+"""
+
+from migrations.runner import (Migration, add_column, add_index, applied_versions, drop_index, pending_migrations,
+                               upgrade_database)
+from migrations.versions import MIGRATIONS
@@ -0,0 +1,93 @@
+""" Applies pending migrations in version order and records each one in schema_migrations """
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect
+from sqlalchemy.engine import Connection, Engine
+# ----- BUILT IN IMPORTS -----
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+
+# Kept out of the models metadata so db.create_all never touches it
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(250), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    One schema change, upgrade is called with a connection inside the migration's transaction
+    Upgrades must be safe to run on a database that db.create_all already brought up to date
+    """
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def applied_versions(engine: Engine) -> Set[int]:
+    """ Versions already recorded in schema_migrations """
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return set(conn.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(engine: Engine, migrations: Optional[List[Migration]] = None) -> List[Migration]:
+    """ Migrations not yet applied to the database, oldest first """
+    if migrations is None:
+        from migrations.versions import MIGRATIONS
+        migrations = MIGRATIONS
+    applied = applied_versions(engine)
+    return sorted((m for m in migrations if m.version not in applied), key=lambda m: m.version)
+
+
+def upgrade_database(engine: Engine, migrations: Optional[List[Migration]] = None, log: Callable = print) -> int:
+    """
+    Apply every pending migration, each in its own transaction with its schema_migrations row
+    A failed migration rolls back alone and stops the upgrade, returns number of migrations applied
+    """
+    applied = 0
+    for migration in pending_migrations(engine, migrations):
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now()
+            ))
+        log(f'Applied migration {migration.version}: {migration.description}')
+        applied += 1
+    return applied
+
+
+# ----- HELPERS FOR MIGRATIONS -----
+def add_index(conn: Connection, name: str, table_name: str, *columns: str) -> None:
+    """ Create an index unless one with that name already exists """
+    existing = {index['name'] for index in inspect(conn).get_indexes(table_name)}
+    if name in existing:
+        return
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    Index(name, *(table.c[column] for column in columns)).create(conn)
+    return
+
+
+def drop_index(conn: Connection, name: str, table_name: str) -> None:
+    """ Drop an index if it exists """
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    for index in table.indexes:
+        if index.name == name:
+            index.drop(conn)
+    return
+
+
+def add_column(conn: Connection, table_name: str, column: Column) -> None:
+    """ Add a nullable column unless the table already has it """
+    existing = {col['name'] for col in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN {column.name} {column_type}')
+    return
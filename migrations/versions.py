@@ -0,0 +1,90 @@
+"""
+Ordered list of schema migrations
+Add new migrations to the end of MIGRATIONS with the next version number, never renumber or edit an applied one
+"""
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import Column, Float, bindparam, text
+from sqlalchemy.engine import Connection
+# ----- PROJECT IMPORTS -----
+from migrations.runner import Migration, add_column, add_index, drop_index
+
+# Rows updated per statement when backfilling a column
+BACKFILL_BATCH = 5000
+
+
+def index_hot_query_paths(conn: Connection) -> None:
+    """ Indexes for the filters in utils/database_queries.py and reading assembly """
+    add_index(conn, 'ix_readings_timestamp', 'readings', 'timestamp')
+    add_index(conn, 'ix_reading_values_reading_id', 'reading_values', 'reading_id')
+    add_index(conn, 'ix_messages_site_id_reading_id', 'messages', 'site_id', 'reading_id')
+    add_index(conn, 'ix_eas_tests_tx_timestamp', 'eas_tests', 'tx_timestamp')
+    add_index(conn, 'ix_eas_site_association_eas_id', 'eas_site_association', 'eas_id')
+    add_index(conn, 'ix_eas_site_association_site_id_eas_id', 'eas_site_association', 'site_id', 'eas_id')
+    return
+
+
+def backfill_site_readings(conn: Connection) -> None:
+    """ Index readings submitted before the site_readings table existed """
+    from utils.reading_index import site_readings_backfill
+    conn.execute(site_readings_backfill())
+    return
+
+
+def index_site_readings_keyset(conn: Connection) -> None:
+    """ Add reading_id to the site_readings index so history pages seek on (timestamp, reading_id) """
+    add_index(conn, 'ix_site_readings_site_id_timestamp_reading_id', 'site_readings',
+              'site_id', 'timestamp', 'reading_id')
+    drop_index(conn, 'ix_site_readings_site_id_timestamp', 'site_readings')
+    return
+
+
+def add_numeric_reading_values(conn: Connection) -> None:
+    """ Store meter values as floats alongside the submitted text, statuses stay text only """
+    from utils.validate_readings import to_numeric
+    add_column(conn, 'reading_values', Column('numeric_value', Float, nullable=True))
+
+    # parsed in Python, SQL casts turn non-numeric text such as N/A into 0
+    rows = conn.execute(text(
+        'SELECT reading_values.channel_id, reading_values.reading_id, reading_values.reading_value '
+        'FROM reading_values JOIN channels ON channels.id = reading_values.channel_id '
+        "WHERE channels.chan_type = 'meter' AND reading_values.numeric_value IS NULL"
+    )).all()
+    update = text(
+        'UPDATE reading_values SET numeric_value = :numeric_value '
+        'WHERE channel_id = :channel_id AND reading_id = :reading_id'
+    ).bindparams(bindparam('numeric_value', type_=Float))
+
+    updates = []
+    for channel_id, reading_id, value in rows:
+        number = to_numeric(value)
+        if number is not None:
+            updates.append(dict(channel_id=channel_id, reading_id=reading_id, numeric_value=number))
+    for i in range(0, len(updates), BACKFILL_BATCH):
+        conn.execute(update, updates[i:i + BACKFILL_BATCH])
+    return
+
+
+def build_daily_rollups(conn: Connection) -> None:
+    """ Fill meter_daily_rollups from readings submitted before rollups were kept """
+    from utils.rollups import rebuild_statements
+    delete, insert = rebuild_statements()
+    conn.execute(delete)
+    conn.execute(insert)
+    return
+
+
+def backfill_limit_excursions(conn: Connection) -> None:
+    """ Record excursions of readings submitted before excursions were kept, using current limits """
+    from utils.excursions import excursion_backfill
+    conn.execute(excursion_backfill())
+    return
+
+
+MIGRATIONS = [
+    Migration(1, 'Index reading, message and EAS lookup columns', index_hot_query_paths),
+    Migration(2, 'Backfill site_readings index', backfill_site_readings),
+    Migration(3, 'Index site_readings for keyset pagination', index_site_readings_keyset),
+    Migration(4, 'Add numeric meter values to reading_values', add_numeric_reading_values),
+    Migration(5, 'Build daily meter rollups', build_daily_rollups),
+    Migration(6, 'Backfill meter limit excursions', backfill_limit_excursions),
+]
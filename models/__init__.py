@@ -4,7 +4,10 @@ When imported to the app file they get created automatically
 """
 
 from models.channels import Channel, MeterConfig, StatusOption
-from models.readings import Reading, ReadingValue, Message, EAS
+from models.excursions import LimitExcursion
+from models.readings import Reading, ReadingValue, Message, EAS, SiteReading
+from models.rollups import MeterDailyRollup
 from models.site import Site
+from models.telemetry import MeterSample
 from models.user import User
 
@@ -0,0 +1,38 @@
+"""
+Create SQL table for meter readings outside their channel's limits
+"""
+from extensions import db
+
+
+class LimitExcursion(db.Model):
+    """
+    Meter value at or beyond a channel limit, evaluated once when the reading is submitted
+    Stores the limit and color in force at that time so later config changes do not rewrite history
+    """
+    __tablename__ = 'limit_excursions'
+    reading_id = db.Column(db.Integer, db.ForeignKey('readings.id'), primary_key=True)
+    channel_id = db.Column(db.Integer, db.ForeignKey('channels.id'), primary_key=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('sites.id'), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    value = db.Column(db.Float, nullable=False)
+    limit_type = db.Column(db.String(5), nullable=False)    # 'upper' or 'lower'
+    limit_value = db.Column(db.Float, nullable=False)
+    color = db.Column(db.String(15), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_limit_excursions_site_id_timestamp', 'site_id', 'timestamp'),
+    )
+
+    def to_dict(self):
+        return dict(
+            reading_id=self.reading_id,
+            channel_id=self.channel_id,
+            timestamp=self.timestamp,
+            value=self.value,
+            limit_type=self.limit_type,
+            limit_value=self.limit_value,
+            color=self.color
+        )
+
+    def __repr__(self):
+        return f"Reading: {self.reading_id}, CH{self.channel_id} | {self.value} past {self.limit_type} limit"
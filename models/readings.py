@@ -19,6 +19,10 @@ class Reading(db.Model):
     messages = db.relationship('Message', backref='reading', lazy=True)
     reading_values = db.relationship('ReadingValue', backref='reading', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_readings_timestamp', 'timestamp'),
+    )
+
     def to_dict(self):
         return dict(
             id=self.id,
@@ -41,6 +45,10 @@ class Message(db.Model):
     site_id = db.Column(db.Integer, db.ForeignKey('sites.id'), nullable=False)
     reading_id = db.Column(db.Integer, db.ForeignKey('readings.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_messages_site_id_reading_id', 'site_id', 'reading_id'),
+    )
+
     def __repr__(self):
         return f"Reading: {self.reading_id} | Message: {self.message}"
 
@@ -48,20 +56,47 @@ class Message(db.Model):
 class ReadingValue(db.Model):
     """
     For any given channel, store submitted data as a string referencing reading and channel ids
+    Meter values are also stored as numbers so they can be aggregated in SQL, null for statuses and non-numeric input
     """
     __tablename__ = 'reading_values'
     channel_id = db.Column(db.Integer, db.ForeignKey('channels.id'), primary_key=True)
     reading_id = db.Column(db.Integer, db.ForeignKey('readings.id'), primary_key=True)
     reading_value = db.Column(db.String(250), nullable=False)
+    numeric_value = db.Column(db.Float, nullable=True)
+
+    # primary key leads with channel_id, lookups by reading need their own index
+    __table_args__ = (
+        db.Index('ix_reading_values_reading_id', 'reading_id'),
+    )
 
     def __repr__(self):
         return f"Reading: {self.reading_id}, CH{self.channel_id} | Value: {self.reading_value}"
 
 
+class SiteReading(db.Model):
+    """
+    Records which sites have values in a reading
+    Timestamp is copied from the reading so a site's readings page straight off the (site_id, timestamp, reading_id) index
+    """
+    __tablename__ = 'site_readings'
+    site_id = db.Column(db.Integer, db.ForeignKey('sites.id'), primary_key=True)
+    reading_id = db.Column(db.Integer, db.ForeignKey('readings.id'), primary_key=True)
+    timestamp = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_site_readings_site_id_timestamp_reading_id', 'site_id', 'timestamp', 'reading_id'),
+    )
+
+    def __repr__(self):
+        return f"Site: {self.site_id} | Reading: {self.reading_id}"
+
+
 # Association table creating a many-to-many relationship between EAS and Site
 eas_site_association = db.Table('eas_site_association',
                                 db.Column('eas_id', db.Integer, db.ForeignKey('eas_tests.id')),
-                                db.Column('site_id', db.Integer, db.ForeignKey('sites.id'))
+                                db.Column('site_id', db.Integer, db.ForeignKey('sites.id')),
+                                db.Index('ix_eas_site_association_eas_id', 'eas_id'),
+                                db.Index('ix_eas_site_association_site_id_eas_id', 'site_id', 'eas_id')
                                 )
 
 
@@ -76,6 +111,10 @@ class EAS(db.Model):
     tx_timestamp = db.Column(db.DateTime, nullable=False)
     sites = db.relationship('Site', secondary=eas_site_association, backref='eas_tests', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_eas_tests_tx_timestamp', 'tx_timestamp'),
+    )
+
     def to_dict(self):
         if self.originating:
             return dict(
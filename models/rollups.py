@@ -0,0 +1,25 @@
+"""
+Create SQL table for daily summaries of meter channel readings
+"""
+from extensions import db
+
+
+class MeterDailyRollup(db.Model):
+    """
+    Running totals of a meter channel's submitted readings on one day
+    Min, max, mean and standard deviation over any range are derived from these rows without reading raw values
+    Limit counts use the channel's meter config when each reading was submitted
+    """
+    __tablename__ = 'meter_daily_rollups'
+    channel_id = db.Column(db.Integer, db.ForeignKey('channels.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    min_value = db.Column(db.Float, nullable=False)
+    max_value = db.Column(db.Float, nullable=False)
+    sum_value = db.Column(db.Float, nullable=False)
+    sum_squares = db.Column(db.Float, nullable=False)
+    above_upper = db.Column(db.Integer, nullable=False)     # readings at or above upper_limit
+    below_lower = db.Column(db.Integer, nullable=False)     # readings at or below lower_limit
+
+    def __repr__(self):
+        return f"CH{self.channel_id} on {self.day.strftime('%m-%d-%Y')} | {self.count} readings"
@@ -0,0 +1,18 @@
+"""
+Create SQL table for meter values polled from the Burk units in the background
+"""
+from extensions import db
+
+
+class MeterSample(db.Model):
+    """
+    Meter channel value recorded by the telemetry sampler
+    Keyed by channel then time so a channel's history is a single index range scan
+    """
+    __tablename__ = 'meter_samples'
+    channel_id = db.Column(db.Integer, db.ForeignKey('channels.id'), primary_key=True)
+    timestamp = db.Column(db.DateTime, primary_key=True)
+    value = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"CH{self.channel_id} at {self.timestamp.strftime('%m-%d-%Y %H:%M:%S')} | Value: {self.value}"
@@ -9,8 +9,10 @@ from marshmallow import ValidationError
 from werkzeug.security import generate_password_hash
 # ----- PROJECT IMPORTS -----
 from extensions import db
-from models import User, Site
+from models import User, Site, SiteReading
 from models.schemas import SiteSchema, UserSchema, UserCreationSchema
+from utils.burk_cache import snapshot_cache
+from utils.site_runtime import invalidate_site_runtime
 
 
 # create Blueprint object
@@ -179,6 +181,7 @@ def add_new_site_post():
         from utils import sort_results_channel_data, create_new_channels
         channel_data = sort_results_channel_data(results)[1]    # returns tuple, new_channel data is at index 1
         create_new_channels(channel_data, target_site.id)
+        invalidate_site_runtime(target_site.id)
 
         flash_message = f"Site: {site_name} added successfully!"
     except Exception as e:
@@ -225,6 +228,8 @@ def update_site_post(site_id: int):
         site.api_key = encrypt_api_key(results.get('api_key'))
 
         db.session.commit()
+        invalidate_site_runtime(site_id)
+        snapshot_cache.invalidate(site_id)
         flash_message = 'Site updated', 'success'
     except ValidationError as err:
         db.session.rollback()
@@ -259,6 +264,7 @@ def update_channels_post(site_id: int):
 
     from utils import handle_channel_update
     handle_channel_update(results, site_id)
+    invalidate_site_runtime(site_id)
 
     flash(f'Channels for site {(Site.query.get(site_id)).site_name} have been updated')
     return redirect(url_for('admin.admin_home'))
@@ -277,8 +283,11 @@ def delete_site(site_id: int):
         from utils import delete_channel
         for channel in site_to_delete.channels:
             delete_channel(channel.id)
+        SiteReading.query.filter_by(site_id=site_id).delete()
         db.session.delete(site_to_delete)
         db.session.commit()
+        invalidate_site_runtime(site_id)
+        snapshot_cache.invalidate(site_id)
 
         flash(f'{site_name} removed and associated channel data deleted')
         return redirect(url_for('admin.admin_home'))
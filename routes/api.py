@@ -2,83 +2,142 @@
 Defines routes to gather data from config/database
 """
 # ----- 3RD PARTY IMPORTS-----
-from flask import abort, Blueprint, current_app, jsonify, render_template, Response
+from flask import abort, Blueprint, current_app, jsonify, render_template, request, Response
+from flask_login import login_required
 # ----- BUILT IN IMPORTS -----
+import queue
 from typing import List
 # ----- PROJECT IMPORTS -----
 from utils import ArcPlus
-from utils.encryption import decrypt_api_key
+from utils.arcplus import sessions
+from utils.burk_cache import snapshot_cache
+from utils.burk_health import BulkheadFullError, CircuitOpenError, site_health
+from utils.burk_polling import collect_snapshots, get_burk_data
+from utils.database_queries import format_reading_cursor, parse_reading_cursor, query_site_readings_before
+from utils.datetime_manipulation import iso_input_to_datetime
+from utils.excursions import query_site_excursions
+from utils.site_runtime import get_all_site_runtimes, get_site_runtime
 from models import Site, Channel
 from models.schemas import SiteSchema, ChannelSchema, MeterConfigSchema, StatusOptionSchema
 
 # create Blueprint object
 api = Blueprint('api', __name__)
 
+# Seconds between keep-alive comments on an idle event stream
+KEEP_ALIVE_SECONDS = 15
+# Readings per page of site history, clients may ask for up to the max
+HISTORY_PAGE_SIZE = 24
+HISTORY_MAX_PAGE_SIZE = 200
+
 
 # ----- BURK API CALL -----
 @api.route('/burk/<int:site_id>/')
-def burk_api_call(site_id: int) -> List[dict]:
+def burk_api_call(site_id: int) -> Response:
     """
     Call API for meter and status data from Burk
     Sort and add data to channels based on extensions setup
+    Served from the snapshot cache unless ?refresh is passed, Age header gives seconds since the Burk was read
     """
-    site = Site.query.get_or_404(site_id)
-    api_key = decrypt_api_key(site.api_key)
+    site = get_site_runtime(site_id)
+    if not site:
+        return abort(404)
 
-    # Get data from Burk unit
-    arcplus = ArcPlus(ip=site.ip_addr, api_key=api_key)
-    meters = arcplus.get_meters()
-    statuses = arcplus.get_status()
+    def load_snapshot():
+        # Get data from Burk unit, fails fast while the site's breaker is open
+        arcplus = ArcPlus(ip=site.ip_addr, api_key=site.api_key)
+        return site_health.call(site.id, arcplus.get_snapshot)
 
-    if not meters and not statuses:
+    refresh = 'refresh' in request.args
+    try:
+        snapshot = None if refresh else snapshot_cache.peek(site.id)
+        if snapshot is None:
+            # the caller loading the unit and every caller waiting on that call hold one of the site's slots,
+            # so a hung unit ties up at most FLASK_BURK_MAX_CONCURRENT threads and later callers fail fast
+            with site_health.bulkhead(site.id):
+                snapshot = snapshot_cache.get(site.id, load_snapshot, refresh=refresh, wait_timeout=sessions.deadline)
+    except (CircuitOpenError, BulkheadFullError) as err:
+        current_app.logger.info(err)
+        return abort(503, str(err))
+    except TimeoutError:
+        current_app.logger.info(f'Gave up waiting on the Burk call in flight for site {site.id}')
+        return abort(503, f'Burk for {site.site_name} is not answering, try again shortly')
+
+    if not snapshot.connected:
         return abort(400, f'Could not connect to {site.site_name}')
     else:
-        burk_data = get_burk_data(site, meters, statuses)
-        return burk_data
+        # partial data is returned when one action fails, missing channel values are null
+        burk_data = get_burk_data(site, snapshot.meters, snapshot.statuses)
+        response = jsonify(burk_data)
+        response.headers['Age'] = str(int(snapshot.age))
+        return response
 
 
-# ----- BURK VALUE SORTING -----
-def get_burk_data(site: Site, meters: list, statuses: list) -> List[dict]:
-    data = []
-    channel_schema = ChannelSchema(many=True)
-    channels = channel_schema.dump(site.channels)
-    for channel in channels:
-        if channel['chan_type'] == 'meter':
-            meter_value = get_meter_value(channel, meters)
-            channel['value'] = meter_value
-            data.append(channel)
-        elif channel['chan_type'] == 'status':
-            status_values = get_status_value(channel, statuses)
-            channel['value'] = status_values
-            data.append(channel)
-    return data
-
-
-def get_meter_value(channel: Channel, meters: List[dict]) -> str:
-    """ Using meter values from Burk API call, append value to channel """
+@api.route('/burk/all')
+def burk_api_call_all_sites() -> Response:
+    """
+    Call every Burk unit concurrently for meter and status data
+    Returns the burk_api_call channel data for each site, channels is null if the site could not connect
+    Sites with a fresh cached snapshot are not called unless ?refresh is passed
+    """
+    sites = get_all_site_runtimes()
+    snapshots = collect_snapshots(sites, refresh='refresh' in request.args)
+
+    site_data = []
+    for site in sites:
+        snapshot = snapshots[site.id]
+        if not snapshot.connected:
+            channels = None
+        else:
+            channels = get_burk_data(site, snapshot.meters, snapshot.statuses)
+        site_data.append(dict(id=site.id, display_name=site.display_name, channels=channels, age=snapshot.age))
+    return jsonify(site_data)
+
+
+@api.route('/burk/stream')
+def burk_stream() -> Response:
+    """
+    Server-Sent Events stream of channel values for every site
+    First event is the full state, later events carry only the channels that changed on a site
+    503 once FLASK_LIVE_FEED_MAX_STREAMS streams are open, the page then polls /api/burk/all
+    """
+    from utils.live_feed import LiveFeedFull, format_sse, live_feed
     try:
-        burk_channel = channel['meter_config'][0]['burk_channel']
-        meter_value = meters[burk_channel - 1]['value']
-    except IndexError:
-        current_app.logger.info(f'Meter Channel {channel.id} at Site {channel.site_id} Burk Data index error')
-        meter_value = None
-    return meter_value
-
-
-def get_status_value(channel: Channel, statuses: List[dict]) -> List[str]:
-    """ Using status values from Burk API, append value to channel """
-    status_values = []
-    for i, option in enumerate(channel['status_options']):
+        subscriber = live_feed.subscribe(current_app._get_current_object())
+    except LiveFeedFull as err:
+        current_app.logger.info(err)
+        return abort(503, str(err))
+
+    def stream():
         try:
-            burk_channel = option['burk_channel']
-            if not burk_channel:
-                status_values.append(None)
-                continue
-            status_value = statuses[burk_channel - 1]['value']
-            status_values.append(status_value)
-        except IndexError:
-            current_app.logger.info(f'Status Channel {channel.id} at Site {channel.site_id} Burk Data index error')
-    return status_values
+            while True:
+                try:
+                    event = subscriber.get(timeout=KEEP_ALIVE_SECONDS)
+                except queue.Empty:
+                    # comment line keeps proxies from closing an idle stream
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            live_feed.unsubscribe(subscriber)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    response = Response(stream(), mimetype='text/event-stream', headers=headers)
+    # frees the stream's slot even if the client leaves before the first event is sent
+    response.call_on_close(lambda: live_feed.unsubscribe(subscriber))
+    return response
+
+
+@api.route('/burk/stats')
+def burk_session_stats() -> Response:
+    """ Request, failure and connection reuse counters for each Burk unit session """
+    from utils.arcplus import sessions
+    return jsonify(sessions.stats())
+
+
+@api.route('/burk/health')
+def burk_site_health() -> Response:
+    """ Circuit breaker state of each site's Burk unit """
+    return jsonify(site_health.stats())
 
 
 # ----- Pass data from database to Javascript -----
@@ -91,6 +150,47 @@ def all_sites() -> Response:
     return jsonify(site_data)
 
 
+@api.route('/site/<int:site_id>/readings')
+@login_required
+def site_readings_history(site_id: int) -> Response:
+    """
+    Page of a site's readings newest first, same reading data as the site page
+    Pass next_cursor back as ?cursor= for the next older page, next_cursor is null on the last page
+    """
+    site = Site.query.get_or_404(site_id)
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), HISTORY_MAX_PAGE_SIZE))
+    try:
+        cursor = parse_reading_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return abort(400, 'Invalid cursor')
+
+    readings = query_site_readings_before(site, limit, cursor)
+
+    from utils import get_valid_readings
+    reading_data = get_valid_readings(readings, site)
+    for reading in reading_data:
+        reading['timestamp'] = reading['timestamp'].isoformat()
+
+    next_cursor = format_reading_cursor(readings[-1]) if len(readings) == limit else None
+    return jsonify(readings=reading_data, next_cursor=next_cursor)
+
+
+@api.route('/site/<int:site_id>/excursions')
+@login_required
+def site_limit_excursions(site_id: int) -> Response:
+    """ Meter values outside their limits on a site between ?start= and ?end= ISO timestamps, oldest first """
+    site = Site.query.get_or_404(site_id)
+    try:
+        dates = (iso_input_to_datetime(request.args['start']), iso_input_to_datetime(request.args['end']))
+    except (KeyError, ValueError):
+        return abort(400, 'start and end ISO timestamps are required')
+
+    excursions = [excursion.to_dict() for excursion in query_site_excursions(site, dates)]
+    for excursion in excursions:
+        excursion['timestamp'] = excursion['timestamp'].isoformat()
+    return jsonify(excursions)
+
+
 @api.route('/site/<int:site_id>/channels')
 def all_site_channels(site_id: int) -> Response:
     """ Called by JS on site refresh failure to connect """
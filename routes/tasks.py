@@ -2,12 +2,15 @@
 Executes tasks such as PDF generation and EAS Log Parsing
 """
 # ----- 3RD PARTY IMPORTS -----
-from flask import Blueprint, make_response, render_template, Response
+from flask import (abort, Blueprint, current_app, jsonify, make_response, render_template, Response, send_file,
+                   stream_with_context, url_for)
+from flask_login import login_required
 
 # ----- PROJECT IMPORTS -----
 from models import Site
 from utils.datetime_manipulation import input_dates_to_datetime
-from utils.tasks import create_pdf, parse_dasdec_logs
+from utils.tasks import (JobQueueFull, create_pdf, parse_dasdec_logs, report_cache, report_cache_key, report_jobs,
+                         stream_readings_csv)
 
 
 # create Blueprint object
@@ -24,17 +27,93 @@ def generate_pdf(site_id: int,
     # convert from string format to datetime format
     date_range = (input_dates_to_datetime(start_date), input_dates_to_datetime(end_date))
 
-    pdf_data = create_pdf(site, date_range)
+    # serve the stored report if nothing it shows has changed since it was rendered
+    cache_key = report_cache_key(site, date_range)
+    pdf_data = report_cache.get(cache_key)
+    cache_status = 'hit'
+    if pdf_data is None:
+        pdf_data = create_pdf(site, date_range)
+        report_cache.put(cache_key, pdf_data)
+        cache_status = 'miss'
 
     # Create response object
     response = make_response(pdf_data)
     response.headers.set('Content-Type', 'application/pdf')
+    response.headers.set('X-Report-Cache', cache_status)
     filename = f"{start_date[:-9]}_to_{end_date[:-9]}_{site.site_name}_report.pdf"          # indexing removes hh:mm:ss
     response.headers.set('Content-Disposition', 'attachment', filename=filename)
 
     return response
 
 
+@tasks.route('report_jobs/<int:site_id>/<start_date>/<end_date>', methods=['POST'])
+@login_required
+def submit_report_job(site_id: int,
+                      start_date: str,
+                      end_date: str) -> Response:
+    """ Queue a PDF report of site readings to render in the background, returns the job id and its urls """
+    site = Site.query.get_or_404(site_id)
+
+    # convert from string format to datetime format
+    date_range = (input_dates_to_datetime(start_date), input_dates_to_datetime(end_date))
+    filename = f"{start_date[:-9]}_to_{end_date[:-9]}_{site.site_name}_report.pdf"          # indexing removes hh:mm:ss
+
+    try:
+        job = report_jobs.submit(site, date_range, filename)
+    except JobQueueFull as err:
+        return make_response(jsonify(error=str(err)), 503)
+    except Exception as err:
+        current_app.logger.exception(f'Report job for site {site_id} could not be queued')
+        return make_response(jsonify(error=f'Report could not be queued: {err}'), 500)
+
+    status = report_jobs.progress(job)
+    status['status_url'] = url_for('tasks.report_job_status', job_id=job.id)
+    status['download_url'] = url_for('tasks.download_report_job', job_id=job.id)
+    return make_response(jsonify(status), 202)
+
+
+@tasks.route('report_jobs/<job_id>')
+@login_required
+def report_job_status(job_id: str) -> Response:
+    """ Status of a report job: queued, running, done or failed, with days rendered and whether the chart is done """
+    job = report_jobs.get(job_id)
+    if not job:
+        return abort(404)
+    return jsonify(report_jobs.progress(job))
+
+
+@tasks.route('report_jobs/<job_id>/download')
+@login_required
+def download_report_job(job_id: str) -> Response:
+    """ PDF of a finished report job """
+    job = report_jobs.get(job_id)
+    if not job:
+        return abort(404)
+    if job.status != 'done':
+        return make_response(jsonify(report_jobs.progress(job)), 409)
+    return send_file(report_jobs.pdf_path(job.id), mimetype='application/pdf', as_attachment=True,
+                     download_name=job.filename)
+
+
+@tasks.route('export/<int:site_id>/<start_date>/<end_date>.csv')
+def export_csv(site_id: int,
+               start_date: str,
+               end_date: str) -> Response:
+    """ Route to stream CSV export of site readings for a date range """
+    site = Site.query.get(site_id)
+    if not site:
+        return abort(404)
+
+    # convert from string format to datetime format
+    date_range = (input_dates_to_datetime(start_date), input_dates_to_datetime(end_date))
+
+    # rows are sent as they are read, the session stays open until the last chunk
+    response = Response(stream_with_context(stream_readings_csv(site, date_range)), mimetype='text/csv')
+    filename = f"{start_date[:-9]}_to_{end_date[:-9]}_{site.site_name}_readings.csv"          # indexing removes hh:mm:ss
+    response.headers.set('Content-Disposition', 'attachment', filename=filename)
+    return response
+
+
 @tasks.route('/parse_dasdec_logs')
 def display_parsed_dasdec_data() -> str:
     """ Route to initiate PDF report of site readings for a date range """
@@ -11,6 +11,12 @@ import re
 from extensions import db
 from models import Site, User, Channel, Reading, ReadingValue, Message, EAS
 from models.schemas import SiteSchema, UserSchema
+from utils.excursions import record_excursions
+from utils.database_queries import format_reading_cursor, query_latest_readings_for_site
+from utils.reading_index import record_site_readings
+from utils.rollups import update_daily_rollups
+from utils.site_runtime import get_site_matcher
+from utils.validate_readings import to_numeric
 
 # create Blueprint object
 views = Blueprint('views', __name__)
@@ -42,102 +48,82 @@ def readings():
 @views.route('/home', methods=['POST'])
 @login_required
 def readings_post():
-    """ Details posting data from homepage form """
+    """ Details posting data from homepage form, the whole submission is one transaction """
     # get input data from form
     form_data = request.form
     timestamp = datetime.datetime.now()
 
-    # Attempt to post data to database, return any error to flash to User
-    reading_errors = post_reading(form_data, timestamp)
-    reading = Reading.query.filter_by(timestamp=timestamp).first()
-
-    value_errors = post_channel_values(form_data, reading)
-    message_errors = post_messages(form_data, reading)
-
-    error_messages = reading_errors + value_errors + message_errors
-    # Displays error message if any, else database post successful
-    if error_messages:
-        for error in error_messages:
-            flash(error)
+    # Attempt to post data to database, nothing is kept unless every step succeeds
+    try:
+        reading = post_reading(form_data, timestamp)
+        post_channel_values(form_data, reading)
+        record_site_readings(reading)
+        update_daily_rollups(reading)
+        record_excursions(reading)
+        post_messages(form_data, reading)
+        db.session.commit()
+    except Exception as e:
+        # if failure rollback commit and flash error message
+        current_app.logger.error(e)
+        db.session.rollback()
+        flash('Reading post failed, nothing was saved')
     else:
         flash('Post to database successful!')
     return redirect(url_for('views.readings'))
 
 
 def post_reading(form_data, timestamp):
-    """ Create reading object and post the database """
-    error_messages = []
+    """ Create reading object, flushed so its id is assigned before the values are added """
     reading = Reading(
         timestamp=timestamp,
         notes=form_data['notes'],
         user_id=int(form_data['mceod'])
     )
-    try:
-        db.session.add(reading)
-        db.session.commit()
-    except Exception as e:
-        # if failure rollback commit and flash error message
-        current_app.logger.error(e)
-        db.session.rollback()
-        message = f"Reading post failed"
-        error_messages.append(message)
-    return error_messages
+    db.session.add(reading)
+    db.session.flush()
+    return reading
 
 
 def post_channel_values(form_data, reading):
-    """ Post readings values for channels """
-    channel_values = []
-    error_messages = []
-
+    """ Insert reading values for channels in one executemany """
+    inputs = {}
     for key, value in form_data.items():
         # ignore any input that is not a channel input
         match = re.match(r'C(\d+)', key)
         if not match:
             continue
         # gets channel id from input html tag
-        channel_id = int(match.group(1))
-        channel_values.append(ReadingValue(
+        inputs[int(match.group(1))] = value
+    if not inputs:
+        return
+
+    # meter values are also stored as numbers
+    meter_ids = {channel_id for channel_id, in Channel.query.with_entities(Channel.id).filter(
+        Channel.id.in_(inputs), Channel.chan_type == 'meter'
+    )}
+    db.session.execute(db.insert(ReadingValue), [
+        dict(
             reading_value=value,
+            numeric_value=to_numeric(value) if channel_id in meter_ids else None,
             channel_id=channel_id,
             reading_id=reading.id
-        ))
-    for value in channel_values:
-        try:
-            db.session.add(value)
-            db.session.commit()
-        except Exception as e:
-            # if failure rollback commit and flash error message
-            db.session.rollback()
-            message = f"Channel {value.channel_id} post failed"
-            error_messages.append(message)
-    return error_messages
+        )
+        for channel_id, value in inputs.items()
+    ])
+    return
 
 
 def post_messages(results, reading):
-    """ Sort auto-generate messages by site and post to DB"""
-    messages = results.get('messages').splitlines()
-    sites = Site.query.all()
-    error_messages = []
-    for site in sites:
-        site_name = site.display_name
-        site_messages = []
-        for message in messages:
-            if site_name in message:
-                site_messages.append(Message(
-                    message=message,
-                    site_id=site.id,
-                    reading_id=reading.id
-                ))
-        try:
-            db.session.add_all(site_messages)
-            db.session.commit()
-        except Exception as e:
-            # if failure rollback commit and flash error message
-            current_app.logger.info(e)
-            db.session.rollback()
-            message = f"Automated messages for {site.site_name} failed to post"
-            error_messages.append(message)
-    return error_messages
+    """ Sort auto-generate messages by site and add them to the reading's transaction """
+    messages = results.get('messages', '').splitlines()
+    matcher = get_site_matcher()
+    site_messages = []
+    for message in messages:
+        site_id = matcher.match(message)
+        if site_id is not None:
+            site_messages.append(Message(message=message, site_id=site_id, reading_id=reading.id))
+    db.session.add_all(site_messages)
+    return
 
 
 @views.route('/site/<int:site_id>/readings')
@@ -147,13 +133,15 @@ def site(site_id: int):
     site_schema = SiteSchema()
     site_data = site_schema.dump(site)
 
-    # get the 12 most recent readings from the database
-    readings = Reading.query.order_by(Reading.timestamp.desc()).limit(12).all()
+    # get the 12 most recent readings with values for this site, older readings are loaded as the page scrolls
+    readings = query_latest_readings_for_site(site, 12)
+    next_cursor = format_reading_cursor(readings[-1]) if len(readings) == 12 else None
 
     from utils import get_valid_readings
     reading_data = get_valid_readings(readings, site)
 
-    return render_template('main/site.html', site=site_data, channels=site_data['channels'], readings=reading_data)
+    return render_template('main/site.html', site=site_data, channels=site_data['channels'], readings=reading_data,
+                           next_cursor=next_cursor)
 
 
 @views.route('/site/<int:site_id>/eas_tests/')
@@ -11,10 +11,12 @@ Given html with a button in a div like so:
 
 where the URL is routed such that it ends with /start_date/end_date
 and btn_text fills in the submit button of the date query
+suffix is optional and added after end_date, e.g. '.csv'
+on_submit is optional, called with the generated url instead of navigating to it
 */
 
 
-function create_date_form(url, btn_text) {
+function create_date_form(url, btn_text, suffix = '', on_submit = null) {
     // Creates start date, end date form
     let date_form = `
         <form id="date_form">
@@ -29,11 +31,11 @@ function create_date_form(url, btn_text) {
     div = document.getElementById('insert_date_form_here')
     div.innerHTML = date_form
 
-    init_date_form_event_listener(url)
+    init_date_form_event_listener(url, suffix, on_submit)
     }
 
 
-function init_date_form_event_listener(url) {
+function init_date_form_event_listener(url, suffix = '', on_submit = null) {
     // Creates event listener for date form button
     let submit_form = document.getElementById('date_form');
 
@@ -43,8 +45,12 @@ function init_date_form_event_listener(url) {
         const start_date = document.getElementById('start_date').value + ' 00:00:00';
         const end_date = document.getElementById('end_date').value + ' 23:59:59';
 
-        let generated_url = `${url}/${start_date}/${end_date}`;
+        let generated_url = `${url}/${start_date}/${end_date}${suffix}`;
         console.log(generated_url)
+        if (on_submit) {
+            on_submit(generated_url)
+            return
+        }
         window.location.href = generated_url;
     });
 }
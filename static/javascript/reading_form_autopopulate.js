@@ -6,6 +6,13 @@ Automated messaging on channel out of range states
 
 /* --- ON PAGE LOAD --- */
 
+// Burk channel data by site id, kept current by the live update stream
+let live_sites = {}
+// Ids of channels the operator has edited, live updates leave these alone
+let manual_channels = new Set()
+// Milliseconds between polls when the live update stream is not available
+const LIVE_POLL_INTERVAL = 15000
+
 // Clears all inputs on the page
 async function reset_page() {
     let inputTags = document.getElementsByTagName('input')
@@ -22,16 +29,81 @@ async function reset_page() {
 }
 
 
-// Loops through each site and updates each site section on page
+// Loads Burk data for every site in one call and updates each site section on page
 async function load_data_to_form() {
-    // gets names of all sites
-    await get_sites().then(sites => {
-        for (let site of sites) {
-            get_burk_data(site.id, site.display_name).then(channels => {
-                update_site_section(site.display_name, channels)
-        })
+    const response = await fetch('/api/burk/all')
+    if (!response.ok) {return}
+    const sites = await response.json()
+    for (let site of sites) {
+        if (!site.channels) {
+            add_message(`Data from ${site.display_name} did not load automatically. All readings input by user.\n`)
+            continue
+        }
+        store_live_site(site.id, site.display_name, site.channels)
+        update_site_section(site.display_name, site.channels)
     }
-  })
+}
+
+
+// Keeps channel data for a site so live updates can be applied to it
+function store_live_site(site_id, site_name, channels) {
+    let channels_by_id = {}
+    for (let channel of channels) {channels_by_id[channel.id] = channel}
+    live_sites[site_id] = {display_name: site_name, channels: channels_by_id}
+}
+
+
+// Listens to the server's stream of changed channel values and updates the form
+// Polls instead when the server turns the stream away, it caps open streams to keep threads free
+function subscribe_live_updates() {
+    const source = new EventSource('/api/burk/stream')
+    source.onmessage = (message) => {
+        const update = JSON.parse(message.data)
+        // the first event is the full server state, the form already holds it
+        if (update.type !== 'update' || !update.connected) {return}
+        apply_live_channels(update.site_id, update.channels)
+    }
+    source.onerror = () => {
+        // CLOSED means the server refused the stream, otherwise the browser is already reconnecting
+        if (source.readyState === EventSource.CLOSED) {poll_live_updates()}
+    }
+}
+
+
+// Reads every site from the shared Burk cache on an interval and applies the values that changed
+function poll_live_updates() {
+    setInterval(async () => {
+        const response = await fetch('/api/burk/all')
+        if (!response.ok) {return}
+        for (let site of await response.json()) {
+            if (!site.channels || !live_sites[site.id]) {continue}
+            let changed = {}
+            for (let channel of site.channels) {
+                let known = live_sites[site.id].channels[channel.id]
+                if (known && JSON.stringify(known.value) !== JSON.stringify(channel.value)) {
+                    changed[channel.id] = channel.value
+                }
+            }
+            apply_live_channels(site.id, changed)
+        }
+    }, LIVE_POLL_INTERVAL)
+}
+
+
+// Updates a site's stored channels and form inputs, skipping channels the operator has edited
+function apply_live_channels(site_id, values) {
+    let site = live_sites[site_id]
+    if (!site) {return}
+
+    let changed = []
+    for (let [channel_id, value] of Object.entries(values)) {
+        let channel = site.channels[channel_id]
+        if (!channel || manual_channels.has(channel_id)) {continue}
+        channel.value = value
+        remove_message_on_update(site.display_name, channel.title)
+        changed.push(channel)
+    }
+    update_site_section(site.display_name, changed)
 }
 
 
@@ -44,8 +116,9 @@ async function get_sites() {
 
 
 // Calls Flask route that returns current Burk data for site
-async function get_burk_data(site_id, site_name) {
-    response = await fetch(`/api/burk/${site_id}`)
+// refresh skips the server side cache of recent Burk data
+async function get_burk_data(site_id, site_name, refresh = false) {
+    response = await fetch(`/api/burk/${site_id}` + (refresh ? '?refresh=1' : ''))
     if (!response.ok) {
         error = `Data from ${site_name} did not load automatically. All readings input by user.\n`
         add_message(error)
@@ -62,6 +135,8 @@ async function update_site_section(site_name, channels) {
     for (let channel of channels) {
         // find input by designation
         if (channel.chan_type === 'meter') {
+            // value is null when the Burk only returned partial data
+            if (channel.value == null) {continue}
             check_limits(site_name, channel)
 
             let input = document.getElementById(`C${channel.id}`);
@@ -99,11 +174,15 @@ async function check_limits(site_name, channel) {
     }
 
 
+// Config requests by channel id, each channel's config is fetched once per page load
+let channel_configs = {}
+
 // Queries database for config data
 async function get_channel_config(chan_id) {
-    const response = await fetch(`/api/channel_config/${chan_id}`);
-    const config = await response.json();
-    return config;
+    if (!(chan_id in channel_configs)) {
+        channel_configs[chan_id] = fetch(`/api/channel_config/${chan_id}`).then(response => response.json())
+    }
+    return channel_configs[chan_id];
 }
 
 
@@ -139,11 +218,13 @@ async function refresh_site(site_id, site_name) {
     remove_load_error_message(site_name)
 
     // on refresh, remove log messages
-    get_burk_data(site_id, site_name).then(channels => {
+    get_burk_data(site_id, site_name, true).then(channels => {
         if (channels) {
             for (let channel of channels) {
                 remove_message_on_update(site_name, channel.title)
+                manual_channels.delete(String(channel.id))
                 }
+            store_live_site(site_id, site_name, channels)
             update_site_section(site_name, channels)
             return
             }
@@ -232,6 +313,7 @@ function manually_changed(html_tag) {
 
     let channel_id = html_tag.replace('C', '')
     console.log(channel_id)
+    manual_channels.add(channel_id)
 
     // get config data for channel
     get_channel_data(channel_id).then(channel => {
@@ -0,0 +1,71 @@
+/* ----- Readings History -----
+Appends older readings to the site page table as the operator scrolls
+
+Rows are fetched a page at a time from /api/site/<site_id>/readings
+Each page returns a cursor for the next older page, null once the oldest reading is shown
+*/
+
+
+function load_readings_on_scroll(site_id, channels, next_cursor) {
+    // Watches the marker under the readings table and loads the next page when it comes into view
+    const marker = document.getElementById('load_more_readings')
+    if (!next_cursor) {return}
+
+    let loading = false
+    const observer = new IntersectionObserver(async (entries) => {
+        if (!entries[0].isIntersecting || loading) {return}
+        loading = true
+        marker.textContent = 'Loading older readings...'
+
+        const response = await fetch(`/api/site/${site_id}/readings?cursor=${encodeURIComponent(next_cursor)}`)
+        if (!response.ok) {
+            marker.textContent = 'Older readings failed to load'
+            observer.disconnect()
+            return
+        }
+        const page = await response.json()
+        for (let reading of page.readings) {append_reading_row(reading, channels)}
+
+        next_cursor = page.next_cursor
+        marker.textContent = ''
+        loading = false
+        if (!next_cursor) {observer.disconnect()}
+    })
+    observer.observe(marker)
+}
+
+
+function append_reading_row(reading, channels) {
+    // Adds a row matching the server rendered rows of the readings table
+    const table = document.getElementById('readings_table')
+    const row = table.insertRow()
+
+    row.insertCell().textContent = format_timestamp(reading.timestamp)
+    channels.forEach((channel, index) => {
+        const cell = row.insertCell()
+        cell.id = `C${channel.id}`
+        let value = reading.reading_values[index]
+        if (channel.chan_type === 'meter') {value = `${value} ${channel.meter_config[0].units}`}
+        cell.textContent = value
+    })
+
+    const message_cell = row.insertCell()
+    message_cell.style.padding = '0'
+    const list = document.createElement('ul')
+    list.style.textAlign = 'left'
+    list.style.paddingLeft = '25px'
+    for (let message of reading.messages) {
+        const item = document.createElement('li')
+        item.textContent = message
+        list.appendChild(item)
+    }
+    message_cell.appendChild(list)
+}
+
+
+function format_timestamp(iso_timestamp) {
+    // ISO timestamp to MM/DD/YYYY, HH:MM:SS as shown in the server rendered rows
+    const [date, time] = iso_timestamp.split('T')
+    const [year, month, day] = date.split('-')
+    return `${month}/${day}/${year}, ${time.slice(0, 8)}`
+}
@@ -0,0 +1,63 @@
+/* ----- Report Jobs -----
+Queues a PDF report to render in the background and downloads it when it is done
+
+The job is submitted with a POST to /report_jobs/<site_id>/<start_date>/<end_date>
+Its status is polled once a second and shown in place of the date form until the PDF is ready
+*/
+
+const REPORT_POLL_INTERVAL = 1000
+
+
+async function submit_report_job(url) {
+    // Submits the report job, then polls it until it is done or failed
+    const status_text = show_report_status('Queueing report...')
+
+    const response = await fetch(url, {method: 'POST'})
+    const job = await response.json()
+    if (!response.ok) {
+        status_text.textContent = job.error || 'Report could not be queued'
+        return
+    }
+
+    const timer = setInterval(async () => {
+        const status_response = await fetch(job.status_url)
+        if (!status_response.ok) {
+            clearInterval(timer)
+            status_text.textContent = 'Report expired, please generate it again'
+            return
+        }
+        const status = await status_response.json()
+        if (status.status === 'done') {
+            clearInterval(timer)
+            status_text.textContent = 'Report ready'
+            window.location.href = job.download_url
+        } else if (status.status === 'failed') {
+            clearInterval(timer)
+            status_text.textContent = `Report failed: ${status.error}`
+        } else {
+            status_text.textContent = describe_report_progress(status)
+        }
+    }, REPORT_POLL_INTERVAL)
+}
+
+
+function describe_report_progress(status) {
+    // Text describing how far the report has rendered
+    if (status.status === 'queued') {return 'Report queued...'}
+    if (status.chart_done) {return 'Building PDF...'}
+    if (status.days_rendered === status.days_total) {return 'Drawing chart...'}
+    return `Rendering day ${status.days_rendered + 1} of ${status.days_total}...`
+}
+
+
+function show_report_status(text) {
+    // Paragraph under the date form holding the report status
+    let status_text = document.getElementById('report_job_status')
+    if (!status_text) {
+        status_text = document.createElement('p')
+        status_text.id = 'report_job_status'
+        document.getElementById('insert_date_form_here').appendChild(status_text)
+    }
+    status_text.textContent = text
+    return status_text
+}
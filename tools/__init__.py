@@ -0,0 +1,4 @@
+"""
+Tools dir holds development helpers that are not part of the web app
+Simulated Burk units and benchmark scripts, run from the project root with python -m tools.<name>
+"""
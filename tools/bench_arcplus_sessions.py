@@ -0,0 +1,66 @@
+"""
+Compare ArcPlus refresh latency with a new connection per call against the pooled keep-alive sessions
+
+    python -m tools.bench_arcplus_sessions --refreshes 50 --connect-latency 0.05
+"""
+# ----- 3RD PARTY IMPORTS -----
+import requests
+# ----- BUILT IN IMPORTS -----
+import argparse
+import statistics
+import time
+# ----- PROJECT IMPORTS -----
+from tools.burk_simulator import FakeBurkServer
+from utils.arcplus import ArcPlus, sessions
+
+
+def refresh_unpooled(url: str) -> None:
+    """ Old behaviour, a bare requests.get opens a new connection for each action """
+    for action in ('meter', 'status'):
+        requests.get(url, params={'action': action, 'token': 'token'})
+
+
+def refresh_pooled(arcplus: ArcPlus) -> None:
+    arcplus.get_meters()
+    arcplus.get_status()
+
+
+def time_refreshes(refresh, refreshes: int) -> list:
+    timings = []
+    for _ in range(refreshes):
+        start = time.perf_counter()
+        refresh()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    print(f'{label:>10}: mean {statistics.mean(timings) * 1000:7.2f} ms | '
+          f'median {statistics.median(timings) * 1000:7.2f} ms | max {max(timings) * 1000:7.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--refreshes', type=int, default=50)
+    parser.add_argument('--connect-latency', type=float, default=0.05, help='seconds added per new TCP connection')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added per request')
+    args = parser.parse_args()
+
+    with FakeBurkServer(latency=args.latency, connect_latency=args.connect_latency) as unit:
+        arcplus = ArcPlus(ip=unit.address, api_key='token')
+
+        unpooled = time_refreshes(lambda: refresh_unpooled(arcplus.url), args.refreshes)
+        unpooled_connections = unit.connections_accepted
+
+        pooled = time_refreshes(lambda: refresh_pooled(arcplus), args.refreshes)
+        pooled_connections = unit.connections_accepted - unpooled_connections
+
+    report('unpooled', unpooled)
+    report('pooled', pooled)
+    print(f'connections opened: unpooled {unpooled_connections}, pooled {pooled_connections}')
+    print(f'speedup: {statistics.mean(unpooled) / statistics.mean(pooled):.1f}x')
+    print(f'session stats: {sessions.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Load benchmark for /api/burk/<site_id>/ against a fleet of simulated Burk units
+Creates a throwaway database with one site per simulated unit, serves the app locally
+and reports latency percentiles and throughput
+
+    python -m tools.bench_burk_polling --sites 20 --concurrency 8 --requests 500 --latency 0.05 --jitter 0.05
+"""
+# ----- 3RD PARTY IMPORTS -----
+import requests
+from werkzeug.serving import make_server
+# ----- BUILT IN IMPORTS -----
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+# ----- PROJECT IMPORTS -----
+from tools.bench_data import create_bench_app, seed_sites
+from tools.burk_simulator import FakeBurkServer, add_simulator_arguments, simulator_options
+
+
+def run_load(base_url: str, site_ids: list, total: int, concurrency: int, refresh: bool):
+    """ Drive the endpoint from concurrency threads, returns latencies, status codes and wall time """
+    local = threading.local()
+    query = '?refresh=1' if refresh else ''
+
+    def call(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        url = f'{base_url}/api/burk/{random.choice(site_ids)}/{query}'
+        start = time.perf_counter()
+        try:
+            status = session.get(url, timeout=60).status_code
+        except requests.RequestException:
+            status = 'error'
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(total)))
+    wall = time.perf_counter() - start
+    return [latency for latency, _ in results], Counter(status for _, status in results), wall
+
+
+def report(latencies: list, statuses: Counter, wall: float) -> None:
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f'requests: {len(latencies)} in {wall:.2f} s -> {len(latencies) / wall:.1f} req/s')
+    print(f'latency p50 {percentiles[49] * 1000:.1f} ms | p95 {percentiles[94] * 1000:.1f} ms | '
+          f'p99 {percentiles[98] * 1000:.1f} ms | max {max(latencies) * 1000:.1f} ms')
+    print(f'status codes: {dict(statuses)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--site-meters', type=int, default=8, help='meter channels configured per site')
+    parser.add_argument('--site-statuses', type=int, default=4, help='status channels configured per site')
+    parser.add_argument('--cached', action='store_true', help='allow the snapshot cache to answer requests')
+    add_simulator_arguments(parser)
+    args = parser.parse_args()
+
+    units = [FakeBurkServer(**simulator_options(args)).start() for _ in range(args.sites)]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        site_ids = seed_sites(app, [unit.address for unit in units], args.site_meters, args.site_statuses)
+
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            base_url = f'http://127.0.0.1:{server.server_port}'
+            latencies, statuses, wall = run_load(base_url, site_ids, args.requests, args.concurrency,
+                                                 refresh=not args.cached)
+        finally:
+            server.shutdown()
+            for unit in units:
+                unit.stop()
+
+    report(latencies, statuses, wall)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure a Burk refresh (meter + status) made one action after the other against the concurrent snapshot
+Runs against a simulated slow ArcPlus endpoint
+
+    python -m tools.bench_burk_refresh --latency 0.25 --refreshes 20
+"""
+# ----- BUILT IN IMPORTS -----
+import argparse
+import statistics
+import time
+# ----- PROJECT IMPORTS -----
+from tools.burk_simulator import FakeBurkServer
+from utils.arcplus import ArcPlus
+
+
+def refresh_sequential(arcplus: ArcPlus) -> tuple:
+    """ Previous burk_api_call behaviour """
+    return arcplus.get_meters(), arcplus.get_status()
+
+
+def refresh_concurrent(arcplus: ArcPlus) -> tuple:
+    return arcplus.get_snapshot()
+
+
+def time_refreshes(refresh, arcplus: ArcPlus, refreshes: int) -> list:
+    timings = []
+    for _ in range(refreshes):
+        start = time.perf_counter()
+        refresh(arcplus)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    print(f'{label:>12}: mean {statistics.mean(timings) * 1000:7.1f} ms | '
+          f'median {statistics.median(timings) * 1000:7.1f} ms | max {max(timings) * 1000:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--refreshes', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.25, help='seconds the unit takes to answer each action')
+    args = parser.parse_args()
+
+    with FakeBurkServer(latency=args.latency) as unit:
+        arcplus = ArcPlus(ip=unit.address, api_key='token')
+        # warm the pooled connections so both runs measure request latency only
+        arcplus.get_snapshot()
+        sequential = time_refreshes(refresh_sequential, arcplus, args.refreshes)
+        concurrent = time_refreshes(refresh_concurrent, arcplus, args.refreshes)
+
+    report('sequential', sequential)
+    report('concurrent', concurrent)
+    print(f'speedup: {statistics.mean(sequential) / statistics.mean(concurrent):.2f}x')
+
+    # one failing action still yields the other action's data
+    with FakeBurkServer(latency=args.latency, fail_actions=('status',)) as unit:
+        meters, statuses = ArcPlus(ip=unit.address, api_key='token').get_snapshot()
+    print(f'partial refresh with status failing: {len(meters)} meters, {len(statuses)} statuses')
+
+
+if __name__ == '__main__':
+    main()
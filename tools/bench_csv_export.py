@@ -0,0 +1,92 @@
+"""
+CSV export benchmark on a synthetic multi-year dataset
+Compares the streamed export against materializing the range the way create_pdf does
+(query the range, assemble every reading, build a DataFrame) and reports rows/sec and peak RSS
+Each export runs in its own process so peak RSS belongs to that export alone
+
+    python -m tools.bench_csv_export --years 3 --meters 8 --statuses 4
+"""
+# ----- BUILT IN IMPORTS -----
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+# ----- PROJECT IMPORTS -----
+from tools.bench_data import create_bench_app, seed_readings, seed_sites, seed_user
+
+START = datetime(2020, 1, 1)
+MODES = ('streamed', 'materialized')
+
+
+def run_export(database_path: str, mode: str, years: int) -> None:
+    """ Child process: export site 1 over the whole range and print rows, seconds and peak RSS """
+    app = create_bench_app(database_path)
+    from extensions import db
+    from models import Site
+    date_range = (START, START + timedelta(days=365 * years))
+
+    with app.app_context():
+        site = db.session.get(Site, 1)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        if mode == 'streamed':
+            from utils.tasks.csv_export import stream_readings_csv
+            rows = -1   # header line
+            for block in stream_readings_csv(site, date_range):
+                rows += block.count('\n')
+        else:
+            from utils import get_valid_readings
+            from utils.database_queries import query_readings_by_date_range
+            from utils.tasks.pdf_generation import create_readings_dataframe
+            headers = ['Timestamp'] + [channel.title for channel in site.channels] + ['MCEOD']
+            readings = get_valid_readings(query_readings_by_date_range(date_range), site)
+            text = create_readings_dataframe(headers, readings).to_csv(index=False)
+            rows = text.count('\n') - 1
+        elapsed = time.perf_counter() - start
+
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    print(f'{rows} {elapsed} {peak / scale} {(peak - baseline) / scale}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--interval', type=float, default=1.0, help='hours between readings')
+    parser.add_argument('--meters', type=int, default=8)
+    parser.add_argument('--statuses', type=int, default=4)
+    parser.add_argument('--run', nargs=2, metavar=('DATABASE', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_export(args.run[0], args.run[1], args.years)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'export.db')
+        app = create_bench_app(database_path)
+        seed_sites(app, ['127.0.0.1:1', '127.0.0.1:2'], meters=args.meters, statuses=args.statuses)
+        user_id = seed_user(app)
+        count = int(365 * args.years * 24 / args.interval)
+        seed_readings(app, START, count, timedelta(hours=args.interval), user_id)
+        print(f'{count} readings over {args.years} years, '
+              f'{args.meters + args.statuses} channels per site on 2 sites')
+
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'tools.bench_csv_export', '--years', str(args.years),
+                 '--run', database_path, mode],
+                capture_output=True, text=True, check=True
+            ).stdout.split()[-4:]
+            rows, elapsed, peak_mb, growth_mb = int(output[0]), float(output[1]), float(output[2]), float(output[3])
+            print(f'{mode:<13} {rows} rows in {elapsed:.2f} s -> {rows / elapsed:,.0f} rows/s | '
+                  f'peak RSS {peak_mb:.0f} MB (+{growth_mb:.0f} MB during export)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Shared setup for the benchmark scripts
+Throwaway app instances, synthetic sites and readings, and SQL query counting
+"""
+# ----- 3RD PARTY IMPORTS -----
+from cryptography.fernet import Fernet
+from sqlalchemy import event
+# ----- BUILT IN IMPORTS -----
+import os
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+
+def create_bench_app(database_path: str):
+    """ App instance pointed at a fresh SQLite file """
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
+    os.environ.setdefault('FLASK_SECRET_KEY', 'benchmark')
+    os.environ.setdefault('FLASK_ENCRYPTION_KEY', Fernet.generate_key().decode())
+    from app import create_app
+    return create_app()
+
+
+def seed_sites(app, addresses: List[str], meters: int, statuses: int) -> List[int]:
+    """ One site per address with meter and status channels mapped to its Burk channels """
+    from extensions import db
+    from models import Channel, MeterConfig, Site, StatusOption
+    from utils.encryption import encrypt_api_key
+
+    site_ids = []
+    with app.app_context():
+        for i, address in enumerate(addresses):
+            site = Site(site_name=f'Bench_Site_{i + 1}', ip_addr=address, api_key=encrypt_api_key('token'))
+            db.session.add(site)
+            db.session.commit()
+            site_ids.append(site.id)
+
+            for m in range(meters):
+                channel = Channel(chan_type='meter', title=f'Meter {m + 1}', site_id=site.id)
+                db.session.add(channel)
+                db.session.flush()
+                db.session.add(MeterConfig(burk_channel=m + 1, units='kW', nominal_output=50, upper_limit=90,
+                                           upper_lim_color='#ff1717', lower_limit=10, lower_lim_color='#ffff00',
+                                           channel_id=channel.id))
+            for s in range(statuses):
+                channel = Channel(chan_type='status', title=f'Status {s + 1}', site_id=site.id)
+                db.session.add(channel)
+                db.session.flush()
+                db.session.add(StatusOption(burk_channel=s + 1, selected_value='ON', selected_state=True,
+                                            selected_color='#00ff00', channel_id=channel.id))
+                db.session.add(StatusOption(burk_channel=0, selected_value='OFF', selected_state=False,
+                                            selected_color='#ffff00', channel_id=channel.id))
+            db.session.commit()
+    return site_ids
+
+
+def seed_user(app, username: Optional[str] = None, password: Optional[str] = None) -> int:
+    """ Operator account, it can only log in when a password is given """
+    from werkzeug.security import generate_password_hash
+    from extensions import db
+    from models import User
+
+    with app.app_context():
+        user = User(first_name='Bench', last_name='Operator',
+                    username=username or f'bench_{random.randrange(10 ** 9)}',
+                    password=generate_password_hash(password) if password else 'x',
+                    is_admin=False, is_operator=True)
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def seed_readings(app, start: datetime, count: int, interval: timedelta, user_id: int,
+                  message_rate: float = 0.2) -> None:
+    """
+    count readings every interval from start, each with a value for every channel of every site
+    Bulk inserted so multi-year datasets can be built quickly
+    """
+    from extensions import db
+    from models import Channel, Message, Reading, ReadingValue, SiteReading
+
+    with app.app_context():
+        channels = [(channel.id, channel.chan_type, channel.site_id) for channel in Channel.query.all()]
+        site_ids = sorted({site_id for _, _, site_id in channels})
+        next_id = (db.session.query(db.func.max(Reading.id)).scalar() or 0) + 1
+
+        batch = 2000
+        for offset in range(0, count, batch):
+            readings, values, messages, site_readings = [], [], [], []
+            for i in range(offset, min(offset + batch, count)):
+                reading_id = next_id + i
+                readings.append(dict(id=reading_id, timestamp=start + interval * i, notes='', user_id=user_id))
+                for channel_id, chan_type, _ in channels:
+                    if chan_type == 'meter':
+                        number = round(random.uniform(0, 100), 3)
+                        values.append(dict(channel_id=channel_id, reading_id=reading_id,
+                                           reading_value=f'{number:.3f}', numeric_value=number))
+                    else:
+                        values.append(dict(channel_id=channel_id, reading_id=reading_id,
+                                           reading_value=random.choice(['ON', 'OFF']), numeric_value=None))
+                for site_id in site_ids:
+                    site_readings.append(dict(site_id=site_id, reading_id=reading_id, timestamp=start + interval * i))
+                    if random.random() < message_rate:
+                        messages.append(dict(message=f'Bench message for site {site_id}', site_id=site_id,
+                                             reading_id=reading_id))
+            db.session.execute(db.insert(Reading), readings)
+            db.session.execute(db.insert(ReadingValue), values)
+            db.session.execute(db.insert(SiteReading), site_readings)
+            if messages:
+                db.session.execute(db.insert(Message), messages)
+            db.session.commit()
+    return
+
+
+@contextmanager
+def count_queries(engine):
+    """ Yields a one item list holding the number of SQL statements run inside the block """
+    counter = [0]
+
+    def before_cursor_execute(*args):
+        counter[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
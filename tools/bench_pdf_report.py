@@ -0,0 +1,65 @@
+"""
+Benchmark of a site's PDF report over a month of readings
+Reports SQL statements run and wall time of create_pdf on a throwaway SQLite database
+
+    python -m tools.bench_pdf_report --days 31 --interval-minutes 60 --meters 8 --statuses 4 --repeat 3
+"""
+# ----- BUILT IN IMPORTS -----
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+# ----- PROJECT IMPORTS -----
+from tools.bench_data import count_queries, create_bench_app, seed_readings, seed_sites, seed_user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--interval-minutes', type=int, default=60)
+    parser.add_argument('--meters', type=int, default=8, help='meter channels per site')
+    parser.add_argument('--statuses', type=int, default=4, help='status channels per site')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    start = datetime(2023, 1, 1)
+    interval = timedelta(minutes=args.interval_minutes)
+    reading_count = int(timedelta(days=args.days) / interval)
+    date_range = (start, start + timedelta(days=args.days - 1, hours=23, minutes=59, seconds=59))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'report.db'))
+        seed_sites(app, ['127.0.0.1:1', '127.0.0.1:2'], args.meters, args.statuses)
+        user_id = seed_user(app)
+        seed_readings(app, start, reading_count, interval, user_id)
+
+        from extensions import db
+        from models import Site
+        from utils.excursions import excursion_backfill
+        from utils.rollups import rebuild_daily_rollups
+        from utils.tasks import create_pdf
+
+        with app.app_context():
+            rebuild_daily_rollups()
+            db.session.execute(excursion_backfill())
+            db.session.commit()
+
+            timings, query_counts, size = [], [], 0
+            for _ in range(args.repeat):
+                db.session.expire_all()
+                site = db.session.get(Site, 1)
+                with count_queries(db.engine) as queries:
+                    started = time.perf_counter()
+                    size = len(create_pdf(site, date_range))
+                    timings.append(time.perf_counter() - started)
+                query_counts.append(queries[0])
+
+    print(f'{args.days} day report, {reading_count} readings, {args.meters + args.statuses} channels per site')
+    print(f'queries per report: {max(query_counts)}')
+    print(f'wall time: median {statistics.median(timings):.2f} s | min {min(timings):.2f} s | pdf {size / 1024:.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Throughput benchmark for reading submissions to /home
+Serves the app on a throwaway SQLite database and posts full readings forms from concurrent operators
+Reports submissions/sec, latency percentiles of the POST alone (the redirect to the form is not followed),
+failed submissions and whether every saved reading is complete
+
+    python -m tools.bench_reading_submission --sites 4 --meters 20 --statuses 5 --operators 4 --submissions 200
+"""
+# ----- 3RD PARTY IMPORTS -----
+import requests
+from werkzeug.serving import make_server
+# ----- BUILT IN IMPORTS -----
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# ----- PROJECT IMPORTS -----
+from tools.bench_data import create_bench_app, seed_sites, seed_user
+
+PASSWORD = 'bench'
+
+
+def build_form(app, user_id: int) -> dict:
+    """ Readings form as the browser posts it, one input per channel plus an auto-generated message per site """
+    from models import Channel, Site
+    form = {'notes': 'Bench notes', 'mceod': str(user_id)}
+    with app.app_context():
+        for channel in Channel.query.all():
+            value = f'{random.uniform(0, 100):.3f}' if channel.chan_type == 'meter' else 'ON'
+            form[f'C{channel.id}'] = value
+        form['messages'] = '\n'.join(f'{site.display_name} Meter 1 is above upper limit' for site in Site.query.all())
+    return form
+
+
+def run_submissions(base_url: str, usernames: list, form: dict, total: int):
+    """ Each operator posts from its own logged in session, returns latencies and wall time """
+    local = threading.local()
+    assigned = iter(usernames)
+    lock = threading.Lock()
+
+    def submit(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            with lock:
+                username = next(assigned)
+            session = local.session = requests.Session()
+            session.post(f'{base_url}/login', data={'username': username, 'password': PASSWORD})
+        start = time.perf_counter()
+        session.post(f'{base_url}/home', data=form, allow_redirects=False, timeout=60)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(usernames)) as pool:
+        latencies = list(pool.map(submit, range(total)))
+    wall = time.perf_counter() - start
+    return latencies, wall
+
+
+def count_saved(app, channels: int):
+    """ (saved readings, saved readings missing channel values) """
+    from extensions import db
+    from models import Reading, ReadingValue
+    with app.app_context():
+        counts = db.session.query(Reading.id, db.func.count(ReadingValue.channel_id)).outerjoin(
+            ReadingValue, ReadingValue.reading_id == Reading.id
+        ).group_by(Reading.id).all()
+    return len(counts), sum(count != channels for _, count in counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=4)
+    parser.add_argument('--meters', type=int, default=20, help='meter channels per site')
+    parser.add_argument('--statuses', type=int, default=5, help='status channels per site')
+    parser.add_argument('--operators', type=int, default=4, help='concurrent submitting sessions')
+    parser.add_argument('--submissions', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'submit.db'))
+        seed_sites(app, [f'127.0.0.1:{i + 1}' for i in range(args.sites)], args.meters, args.statuses)
+        usernames = [f'operator_{i}' for i in range(args.operators)]
+        user_ids = [seed_user(app, username, PASSWORD) for username in usernames]
+        form = build_form(app, user_ids[0])
+        channels = args.sites * (args.meters + args.statuses)
+
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        app.logger.setLevel(logging.CRITICAL)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            latencies, wall = run_submissions(f'http://127.0.0.1:{server.server_port}', usernames, form,
+                                                        args.submissions)
+        finally:
+            server.shutdown()
+        saved, incomplete = count_saved(app, channels)
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f'{args.submissions} submissions of {channels} channels from {args.operators} operators')
+    print(f'{wall:.2f} s -> {args.submissions / wall:.1f} submissions/s')
+    print(f'latency p50 {percentiles[49] * 1000:.1f} ms | p95 {percentiles[94] * 1000:.1f} ms | '
+          f'max {max(latencies) * 1000:.1f} ms')
+    print(f'failed submissions: {args.submissions - saved} | saved readings missing values: {incomplete}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of building a large daily readings table for the PDF report
+Times the dataframe, excursion colors and ReportLab cells of one day from an in-memory SiteReportData, no database
+
+    python -m tools.bench_report_tables --readings 1440 --meters 32 --statuses 8 --repeat 5
+"""
+# ----- BUILT IN IMPORTS -----
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+
+def build_report_data(readings: int, meters: int, statuses: int):
+    """ One day of readings every minute, meter values outside 10-90 are recorded as excursions """
+    from utils.reading_pivot import ReadingTable
+    from utils.tasks.report_data import SiteReportData
+
+    channel_ids = tuple(range(1, meters + statuses + 1))
+    start = datetime(2023, 1, 1)
+    rows, excursions = [], {}
+    for i in range(readings):
+        reading_id = i + 1
+        numbers = [round(random.uniform(0, 100), 3) for _ in range(meters)]
+        for channel_id, number in zip(channel_ids, numbers):
+            if number >= 90:
+                excursions[reading_id, channel_id] = '#ff1717'
+            elif number <= 10:
+                excursions[reading_id, channel_id] = '#ffff00'
+        values = [f'{number:.3f}' for number in numbers] + [random.choice(['ON', 'OFF']) for _ in range(statuses)]
+        rows.append((reading_id, start + timedelta(minutes=i), 'Bench Operator', '', *values, *numbers,
+                     *([None] * statuses)))
+
+    table = ReadingTable(
+        channel_ids=channel_ids,
+        titles=tuple(f'Channel {channel_id}' for channel_id in channel_ids),
+        chan_types=('meter',) * meters + ('status',) * statuses,
+        rows=rows
+    )
+    return SiteReportData(
+        site_id=1, site_name='Bench_Site', date_range=(start, start + timedelta(hours=23, minutes=59)),
+        dates=[start], table=table, units=('kW',) * meters + ('',) * statuses, messages={},
+        excursion_colors=excursions, summaries=[]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readings', type=int, default=1440)
+    parser.add_argument('--meters', type=int, default=32)
+    parser.add_argument('--statuses', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from utils.tasks.pdf_generation import (create_readings_dataframe_from_table, create_table_from_readings_dataframe,
+                                            define_styles)
+    random.seed(1)
+    site_data = build_report_data(args.readings, args.meters, args.statuses)
+    date = site_data.dates[0]
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        styles = define_styles()
+        day_table = site_data.day_table(date)
+        readings_df = create_readings_dataframe_from_table(day_table)
+        cell_colors = site_data.cell_colors(day_table)
+        create_table_from_readings_dataframe(readings_df, styles, cell_colors)
+        timings.append(time.perf_counter() - started)
+
+    cells = args.readings * (args.meters + args.statuses + 2)
+    print(f'{args.readings} readings x {args.meters + args.statuses} channels, '
+          f'{len(site_data.excursion_colors)} excursions, {cells} cells')
+    print(f'table build: median {statistics.median(timings):.3f} s | min {min(timings):.3f} s | '
+          f'{cells / statistics.median(timings):,.0f} cells/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Simulated Burk unit serving api.cgi?action=meter|status on localhost
+Used to exercise ArcPlus without a real transmitter site
+
+    with FakeBurkServer(latency=0.05, jitter=0.02, error_rate=0.01) as unit:
+        arcplus = ArcPlus(ip=unit.address, api_key='token')
+
+Run standalone to serve a fleet of simulated units until interrupted:
+
+    python -m tools.burk_simulator --units 20 --latency 0.1 --jitter 0.05 --error-rate 0.02
+"""
+# ----- BUILT IN IMPORTS -----
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeBurkHandler(BaseHTTPRequestHandler):
+    """ Answers ArcPlus API calls over keep-alive HTTP/1.1 connections """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        """ Runs once per TCP connection, delay stands in for the handshake round trip to a remote site """
+        super().setup()
+        self.server.count('connections_accepted')
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+
+    def do_GET(self):
+        request = urlparse(self.path)
+        params = parse_qs(request.query)
+        action = params.get('action', [''])[0]
+
+        if request.path != '/api.cgi' or action not in ('meter', 'status'):
+            self.send_json(404, {'error': 'unknown action'})
+            return
+
+        server = self.server
+        if server.timeout_rate and random.random() < server.timeout_rate:
+            # unit stops answering, the client's read timeout has to give up on it
+            server.count('requests_timed_out')
+            time.sleep(server.hang_seconds)
+            self.close_connection = True
+            return
+
+        delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if action in server.fail_actions or (server.error_rate and random.random() < server.error_rate):
+            server.count('requests_failed')
+            self.send_json(500, {'error': f'{action} unavailable'})
+            return
+        server.count('requests_served')
+        self.send_json(200, {action: server.channel_data(action)})
+
+    def send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Silence per-request logging """
+        return
+
+
+class FakeBurkServer(ThreadingHTTPServer):
+    """
+    Threaded simulated Burk unit bound to localhost
+    latency + uniform(0, jitter) seconds is added to every answer,
+    error_rate of requests get a 500, timeout_rate of requests hang for hang_seconds without answering
+    """
+    daemon_threads = True
+
+    def __init__(self, meters: int = 16, statuses: int = 16, latency: float = 0.0, connect_latency: float = 0.0,
+                 fail_actions: tuple = (), jitter: float = 0.0, error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, hang_seconds: float = 30.0, port: int = 0):
+        super().__init__(('127.0.0.1', port), FakeBurkHandler)
+        self.meters = meters
+        self.statuses = statuses
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.fail_actions = fail_actions
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.connections_accepted = 0
+        self.requests_served = 0
+        self.requests_failed = 0
+        self.requests_timed_out = 0
+        self._counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        """ host:port in the form stored as Site.ip_addr """
+        host, port = self.server_address[:2]
+        return f'{host}:{port}'
+
+    def count(self, counter: str) -> None:
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        return
+
+    def channel_data(self, action: str) -> list:
+        if action == 'meter':
+            return [{'value': round(random.uniform(0, 100), 3)} for _ in range(self.meters)]
+        return [{'value': random.choice([True, False])} for _ in range(self.statuses)]
+
+    def start(self) -> 'FakeBurkServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        return
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def add_simulator_arguments(parser: argparse.ArgumentParser) -> None:
+    """ Unit behaviour options shared with the benchmark scripts """
+    parser.add_argument('--meters', type=int, default=16, help='meter channels per unit')
+    parser.add_argument('--statuses', type=int, default=16, help='status channels per unit')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every answer')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds per answer')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 500')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of requests never answered')
+    parser.add_argument('--hang-seconds', type=float, default=30.0, help='how long an unanswered request hangs')
+    return
+
+
+def simulator_options(args: argparse.Namespace) -> dict:
+    return dict(meters=args.meters, statuses=args.statuses, latency=args.latency, jitter=args.jitter,
+                error_rate=args.error_rate, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--units', type=int, default=1)
+    parser.add_argument('--base-port', type=int, default=0, help='first port, units take consecutive ports. 0 picks free ports')
+    add_simulator_arguments(parser)
+    args = parser.parse_args()
+
+    units = []
+    for i in range(args.units):
+        port = args.base_port + i if args.base_port else 0
+        units.append(FakeBurkServer(port=port, **simulator_options(args)).start())
+        print(f'unit {i + 1}: {units[-1].address}')
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for unit in units:
+            unit.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Query count regression check for reading assembly
+get_valid_readings must load a site's readings in the same number of queries no matter how many readings there are
+Exits non-zero if the count grows with the number of readings
+
+    python -m tools.check_query_counts
+"""
+# ----- BUILT IN IMPORTS -----
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+# ----- PROJECT IMPORTS -----
+from tools.bench_data import count_queries, create_bench_app, seed_readings, seed_sites, seed_user
+
+READING_COUNTS = (12, 124, 480)
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'queries.db'))
+        seed_sites(app, ['127.0.0.1:1', '127.0.0.1:2'], meters=8, statuses=4)
+        user_id = seed_user(app)
+        seed_readings(app, datetime(2023, 1, 1), max(READING_COUNTS), timedelta(hours=1), user_id)
+
+        from extensions import db
+        from models import Reading, Site
+        from utils import get_valid_readings
+
+        counts = {}
+        with app.app_context():
+            for reading_count in READING_COUNTS:
+                site = db.session.get(Site, 1)
+                readings = Reading.query.order_by(Reading.timestamp.desc()).limit(reading_count).all()
+                with count_queries(db.engine) as queries:
+                    data = get_valid_readings(readings, site)
+                counts[reading_count] = queries[0]
+                print(f'{reading_count:>4} readings -> {len(data):>4} rows in {queries[0]} queries')
+                db.session.expire_all()
+
+    if len(set(counts.values())) != 1:
+        print('FAIL: query count grows with the number of readings')
+        return 1
+    print('OK: constant query count')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
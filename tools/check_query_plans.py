@@ -0,0 +1,154 @@
+"""
+Query plan regression check for the hot query paths
+Runs each query in utils/database_queries.py and the reading assembly loaders against a migrated SQLite database
+and checks EXPLAIN QUERY PLAN searches the expected index instead of scanning the table
+Exits non-zero if any query lost its index
+
+    python -m tools.check_query_plans
+"""
+# ----- BUILT IN IMPORTS -----
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import event
+# ----- PROJECT IMPORTS -----
+from tools.bench_data import create_bench_app, seed_readings, seed_sites, seed_user
+
+START = datetime(2023, 1, 1)
+RANGE = (datetime(2023, 1, 2), datetime(2023, 1, 3))
+
+
+@contextmanager
+def capture_statements(engine):
+    """ Collect (sql, parameters) of every statement run inside the block """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(engine, statement: str, parameters) -> List[str]:
+    """ Detail column of each EXPLAIN QUERY PLAN row """
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+
+def hot_queries(site) -> Dict[str, Tuple[Callable, Tuple[str, ...]]]:
+    """ name: (call running the query, indexes the plan must search) """
+    from utils.database_queries import (query_eas_tests_by_date_range, query_latest_readings_for_site,
+                                        query_readings_by_date, query_readings_by_date_range,
+                                        query_site_readings_before, query_site_readings_in_range)
+    from utils.excursions import query_site_excursions
+    from utils.reading_pivot import query_reading_table
+    from utils.validate_readings import load_reading_values, load_site_messages
+    channel_ids = [channel.id for channel in site.channels]
+
+    return {
+        'query_readings_by_date': (
+            lambda: query_readings_by_date(RANGE[0]),
+            ('ix_readings_timestamp',)
+        ),
+        'query_readings_by_date_range': (
+            lambda: query_readings_by_date_range(RANGE),
+            ('ix_readings_timestamp',)
+        ),
+        'query_latest_readings_for_site': (
+            lambda: query_latest_readings_for_site(site, 12),
+            ('ix_site_readings_site_id_timestamp_reading_id',)
+        ),
+        'query_site_readings_before': (
+            lambda: query_site_readings_before(site, 24, (RANGE[1], 10 ** 9)),
+            ('ix_site_readings_site_id_timestamp_reading_id',)
+        ),
+        'query_site_readings_in_range': (
+            lambda: query_site_readings_in_range(RANGE, site, 1000, (RANGE[0], 1)),
+            ('ix_site_readings_site_id_timestamp_reading_id',)
+        ),
+        'query_eas_tests_by_date_range': (
+            lambda: query_eas_tests_by_date_range(RANGE),
+            ('ix_eas_tests_tx_timestamp',)
+        ),
+        'query_eas_tests_by_date_range (site)': (
+            lambda: query_eas_tests_by_date_range(RANGE, site),
+            ('ix_eas_tests_tx_timestamp|ix_eas_site_association_site_id_eas_id',
+             'ix_eas_site_association_eas_id|ix_eas_site_association_site_id_eas_id')
+        ),
+        'query_reading_table': (
+            lambda: query_reading_table(site, RANGE),
+            ('ix_site_readings_site_id_timestamp_reading_id',
+             'ix_reading_values_reading_id|sqlite_autoindex_reading_values_1')
+        ),
+        'query_site_excursions': (
+            lambda: query_site_excursions(site, RANGE),
+            ('ix_limit_excursions_site_id_timestamp',)
+        ),
+        'load_reading_values': (
+            lambda: load_reading_values(list(range(1, 50)), channel_ids),
+            ('ix_reading_values_reading_id|sqlite_autoindex_reading_values_1',)
+        ),
+        'load_site_messages': (
+            lambda: load_site_messages(list(range(1, 50)), site.id),
+            ('ix_messages_site_id_reading_id',)
+        ),
+    }
+
+
+def check_plan(plan: List[str], indexes: Tuple[str, ...]) -> List[str]:
+    """ Problems with the plan, each entry of indexes is a | separated list of acceptable index names """
+    problems = []
+    text = '\n'.join(plan)
+    for options in indexes:
+        if not any(f'INDEX {name}' in text for name in options.split('|')):
+            problems.append(f'no search using {options}')
+    for line in plan:
+        if line.startswith('SCAN ') and 'USING' not in line:
+            problems.append(f'full table scan: {line}')
+    return problems
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'plans.db'))
+        seed_sites(app, ['127.0.0.1:1', '127.0.0.1:2'], meters=4, statuses=2)
+        user_id = seed_user(app)
+        seed_readings(app, START, 24 * 7, timedelta(hours=1), user_id)
+
+        from extensions import db
+        from models import Site
+
+        failures = 0
+        with app.app_context():
+            site = db.session.get(Site, 1)
+            for name, (run_query, indexes) in hot_queries(site).items():
+                with capture_statements(db.engine) as statements:
+                    run_query()
+                # last statement is the query under test, earlier ones are lazy loads
+                plan = explain(db.engine, *statements[-1])
+                problems = check_plan(plan, indexes)
+                print(f'{"FAIL" if problems else "OK":<5}{name}')
+                for line in plan:
+                    print(f'       {line}')
+                for problem in problems:
+                    print(f'     ! {problem}')
+                failures += bool(problems)
+
+    if failures:
+        print(f'FAIL: {failures} queries lost their index')
+        return 1
+    print('OK: every hot query searches an index')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,14 +5,134 @@ Can use to add extensions info to database by Pickling this object
 """
 
 import json
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import field, dataclass
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional, Tuple
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds, overridden by FLASK_BURK_CONNECT_TIMEOUT / FLASK_BURK_READ_TIMEOUT
+DEFAULT_TIMEOUT = (3.05, 10.0)
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.25
+DEFAULT_POOL_SIZE = 4
+# Seconds a full meter + status refresh may take, overridden by FLASK_BURK_DEADLINE
+DEFAULT_DEADLINE = 8.0
+FETCH_WORKERS = 16
+
+
+@dataclass
+class SessionStats:
+    """ Counters kept for each Burk unit session """
+    requests: int = 0
+    failures: int = 0
+    retries: int = 0
+
+
+class SessionRegistry:
+    """
+    One pooled keep-alive requests.Session per Burk unit
+    Connections to a unit are reused across API calls instead of opening a new TCP connection each time
+    """
+    def __init__(self):
+        self.timeout = DEFAULT_TIMEOUT
+        self.retries = DEFAULT_RETRIES
+        self.backoff = DEFAULT_BACKOFF
+        self.pool_size = DEFAULT_POOL_SIZE
+        self.deadline = DEFAULT_DEADLINE
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, SessionStats] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict) -> None:
+        """ Load timeout and retry settings from app config, drops any sessions built with old settings """
+        self.timeout = (
+            float(config.get('BURK_CONNECT_TIMEOUT', DEFAULT_TIMEOUT[0])),
+            float(config.get('BURK_READ_TIMEOUT', DEFAULT_TIMEOUT[1]))
+        )
+        self.retries = int(config.get('BURK_RETRIES', DEFAULT_RETRIES))
+        self.backoff = float(config.get('BURK_BACKOFF', DEFAULT_BACKOFF))
+        self.pool_size = int(config.get('BURK_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.deadline = float(config.get('BURK_DEADLINE', DEFAULT_DEADLINE))
+        self.close_all()
+        return
+
+    def get(self, ip: str) -> requests.Session:
+        """ Return the session for a unit, creating it on first use """
+        with self._lock:
+            session = self._sessions.get(ip)
+            if session is None:
+                session = self._create_session()
+                self._sessions[ip] = session
+                self._stats.setdefault(ip, SessionStats())
+            return session
+
+    def _create_session(self) -> requests.Session:
+        """ Session with bounded retries and backoff on connection errors and gateway responses """
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def record(self, ip: str, success: bool, retries: int = 0) -> None:
+        """ Update counters for a unit after an API call """
+        with self._lock:
+            stats = self._stats.setdefault(ip, SessionStats())
+            stats.requests += 1
+            stats.retries += retries
+            if not success:
+                stats.failures += 1
+        return
+
+    def stats(self) -> Dict[str, dict]:
+        """ Request, failure and connection reuse counters for every unit """
+        with self._lock:
+            sessions = dict(self._sessions)
+            output = {ip: dict(vars(stats)) for ip, stats in self._stats.items()}
+
+        for ip, data in output.items():
+            session = sessions.get(ip)
+            opened = count_connections_opened(session) if session else 0
+            data['connections_opened'] = opened
+            data['connections_reused'] = max(data['requests'] - opened, 0)
+        return output
+
+    def close_all(self) -> None:
+        """ Close all pooled connections """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        return
+
+
+def count_connections_opened(session: requests.Session) -> int:
+    """ Number of TCP connections the session's urllib3 pools have opened """
+    pools = session.get_adapter('http://').poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+
+# Shared by every ArcPlus object in the process
+sessions = SessionRegistry()
+# Threads used to run the meter and status requests of a refresh side by side
+fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='arcplus')
 
 
 @dataclass
 class ArcPlus:
     ip: str
     api_key: str
+    timeout: Optional[Tuple[float, float]] = None
     url: str = field(init=False)
 
     def __post_init__(self):
@@ -27,16 +147,20 @@ class ArcPlus:
             "token": self.api_key
         }
 
+        session = sessions.get(self.ip)
         try:
-            response = requests.get(self.url, params=params)
+            response = session.get(self.url, params=params, timeout=self.timeout or sessions.timeout)
+            retries = get_retry_count(response)
             if response.status_code == 200:
                 data = json.loads(response.text)
+                sessions.record(self.ip, success=True, retries=retries)
                 return data[action]
+            sessions.record(self.ip, success=False, retries=retries)
         except Exception as err:
+            sessions.record(self.ip, success=False)
             print(f'Error connecting {self.ip}')
             return None
 
-
     def get_meters(self) -> list:
         """Get meter data"""
         data = self.get_data('meter')
@@ -50,3 +174,29 @@ class ArcPlus:
         if not data:
             return []
         return data
+
+    def get_snapshot(self, deadline: Optional[float] = None) -> Tuple[list, list]:
+        """
+        Get meter and status data concurrently so a refresh costs one round trip
+        Any action not answered within the shared deadline comes back as an empty list
+        """
+        futures = {action: fetch_pool.submit(self.get_data, action) for action in ('meter', 'status')}
+        done, _ = wait(futures.values(), timeout=deadline or sessions.deadline)
+
+        results = {}
+        for action, future in futures.items():
+            if future in done:
+                results[action] = future.result() or []
+            else:
+                future.cancel()
+                print(f'Deadline exceeded for {action} data from {self.ip}')
+                results[action] = []
+        return results['meter'], results['status']
+
+
+def get_retry_count(response: requests.Response) -> int:
+    """ Number of retries urllib3 made before getting the response """
+    retries = getattr(response.raw, 'retries', None)
+    if retries is None:
+        return 0
+    return len(retries.history)
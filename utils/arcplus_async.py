@@ -0,0 +1,119 @@
+"""
+Asynchronous ArcPlus client
+Queries every Burk unit at once with httpx so a fleet refresh takes as long as the slowest site
+One AsyncClient lives on a dedicated event loop thread so keep-alive connections to each unit survive between refreshes
+"""
+# ----- 3RD PARTY IMPORTS -----
+import httpx
+# ----- BUILT IN IMPORTS -----
+import asyncio
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from utils.arcplus import sessions
+
+# Idle keep-alive connections kept across all units, two per unit covers meter and status for a large fleet
+MAX_KEEPALIVE_CONNECTIONS = 64
+
+
+@dataclass
+class AsyncArcPlus:
+    ip: str
+    api_key: str
+    url: str = field(init=False)
+
+    def __post_init__(self):
+        """ Create params after instantiation """
+        self.url = f"http://{self.ip}/api.cgi"
+
+    # ----- API CALLS-----
+    async def get_data(self, client: httpx.AsyncClient, action: str) -> Optional[list]:
+        """ Make request to Burk for JSON data of specific type """
+        params = {
+            "action": action,
+            "token": self.api_key
+        }
+
+        try:
+            response = await client.get(self.url, params=params)
+            if response.status_code == 200:
+                return response.json()[action]
+        except Exception as err:
+            print(f'Error connecting {self.ip}')
+        return None
+
+    async def get_snapshot(self, client: httpx.AsyncClient) -> Tuple[list, list]:
+        """ Get meter and status data concurrently """
+        meters, statuses = await asyncio.gather(self.get_data(client, 'meter'), self.get_data(client, 'status'))
+        return meters or [], statuses or []
+
+
+class AsyncClientLoop:
+    """
+    Event loop thread owning the shared AsyncClient, request threads submit coroutines to it and block on the result
+    The client is rebuilt when the FLASK_BURK_* timeouts it was built with change
+    """
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_timeout: Optional[Tuple[float, float]] = None
+        self._lock = threading.Lock()
+
+    def run(self, coroutine):
+        """ Run a coroutine on the loop thread and wait for its result """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    async def client(self) -> httpx.AsyncClient:
+        """ Shared client, only called from coroutines on the loop thread """
+        if self._client is None or self._client_timeout != sessions.timeout:
+            if self._client is not None:
+                await self._client.aclose()
+            timeout = httpx.Timeout(sessions.timeout[1], connect=sessions.timeout[0])
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS)
+            self._client = httpx.AsyncClient(timeout=timeout, limits=limits)
+            self._client_timeout = sessions.timeout
+        return self._client
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='arcplus-async', daemon=True).start()
+            return self._loop
+
+
+async def gather_snapshots(units: Dict[int, AsyncArcPlus],
+                           deadline: float,
+                           jitter: float = 0.0) -> Dict[int, Tuple[list, list]]:
+    """
+    Query all units concurrently, a unit that misses its deadline returns empty data
+    jitter delays each unit's call by a random 0 - jitter seconds so units are not hit in lockstep
+    """
+    client = await client_loop.client()
+
+    async def fetch(unit: AsyncArcPlus) -> Tuple[list, list]:
+        if jitter:
+            await asyncio.sleep(random.uniform(0, jitter))
+        try:
+            return await asyncio.wait_for(unit.get_snapshot(client), deadline)
+        except asyncio.TimeoutError:
+            print(f'Deadline exceeded for {unit.ip}')
+            return [], []
+
+    snapshots = await asyncio.gather(*(fetch(unit) for unit in units.values()))
+    return dict(zip(units.keys(), snapshots))
+
+
+def fetch_all_snapshots(units: Dict[int, AsyncArcPlus],
+                        deadline: Optional[float] = None,
+                        jitter: float = 0.0) -> Dict[int, Tuple[list, list]]:
+    """ Blocking entry point for Flask routes, returns (meters, statuses) keyed like units """
+    if not units:
+        return {}
+    return client_loop.run(gather_snapshots(units, deadline or sessions.deadline, jitter))
+
+
+# Shared by every request and background thread in the process
+client_loop = AsyncClientLoop()
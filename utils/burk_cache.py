@@ -0,0 +1,112 @@
+"""
+Per-site cache of Burk meter and status snapshots
+Operators loading the readings page at the same time share one ArcPlus call per site
+"""
+# ----- BUILT IN IMPORTS -----
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+# Seconds a snapshot is served from cache, overridden by FLASK_BURK_CACHE_TTL
+DEFAULT_TTL = 15.0
+
+
+@dataclass
+class Snapshot:
+    """ Meter and status data from one Burk API call """
+    meters: list
+    statuses: list
+    fetched_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def age(self) -> float:
+        """ Seconds since the data was read from the Burk unit """
+        return time.monotonic() - self.fetched_at
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.meters or self.statuses)
+
+
+class SnapshotCache:
+    """
+    TTL cache with request coalescing
+    Concurrent misses for a site wait on the single in-flight call instead of each calling the unit
+    """
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries: Dict[int, Snapshot] = {}
+        self._in_flight: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict) -> None:
+        """ Load TTL from app config """
+        self.ttl = float(config.get('BURK_CACHE_TTL', DEFAULT_TTL))
+        self.invalidate()
+        return
+
+    def get(self, site_id: int, loader: Callable[[], Tuple[list, list]], refresh: bool = False,
+            wait_timeout: Optional[float] = None) -> Snapshot:
+        """
+        Return the cached snapshot for a site if fresh, else load it
+        refresh skips the cached entry but still joins a call already in flight
+        Callers joining an in-flight call wait at most wait_timeout seconds, then TimeoutError is raised
+        """
+        with self._lock:
+            entry = self._entries.get(site_id)
+            if entry and not refresh and entry.age <= self.ttl:
+                return entry
+
+            in_flight = self._in_flight.get(site_id)
+            if in_flight is None:
+                in_flight = Future()
+                self._in_flight[site_id] = in_flight
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            return in_flight.result(timeout=wait_timeout)
+
+        try:
+            meters, statuses = loader()
+            snapshot = Snapshot(meters, statuses)
+            if snapshot.connected:
+                self.store(site_id, snapshot)
+            in_flight.set_result(snapshot)
+            return snapshot
+        except BaseException as err:
+            in_flight.set_exception(err)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(site_id, None)
+
+    def peek(self, site_id: int, max_age: Optional[float] = None) -> Optional[Snapshot]:
+        """ Cached snapshot for a site if still fresh, max_age tightens the TTL for this lookup """
+        with self._lock:
+            entry = self._entries.get(site_id)
+        if entry and entry.age <= min(self.ttl, max_age if max_age is not None else self.ttl):
+            return entry
+        return None
+
+    def store(self, site_id: int, snapshot: Snapshot) -> None:
+        """ Add a snapshot fetched outside of get() """
+        with self._lock:
+            self._entries[site_id] = snapshot
+        return
+
+    def invalidate(self, site_id: Optional[int] = None) -> None:
+        """ Drop one site's snapshot or the whole cache """
+        with self._lock:
+            if site_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(site_id, None)
+        return
+
+
+# Shared by every request in the process
+snapshot_cache = SnapshotCache()
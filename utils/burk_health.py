@@ -0,0 +1,150 @@
+"""
+Per-site health tracking for Burk units
+Circuit breaker fails calls fast while a unit is unreachable
+Bulkhead caps how many request threads can be tied up waiting on one unit
+"""
+# ----- BUILT IN IMPORTS -----
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Tuple
+
+# Defaults overridden by FLASK_BURK_BREAKER_THRESHOLD, FLASK_BURK_BREAKER_COOLDOWN and FLASK_BURK_MAX_CONCURRENT
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 30.0
+DEFAULT_MAX_CONCURRENT = 2
+
+
+class CircuitOpenError(Exception):
+    """ Raised instead of calling a unit whose breaker is open """
+
+
+class BulkheadFullError(Exception):
+    """ Raised when a unit already has its share of request threads """
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through, consecutive failures are counted
+    open: calls fail fast until the cooldown has passed
+    half_open: a single probe call is let through, success closes the breaker and failure reopens it
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """ True if a call may be made now """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            # open and cooling down, or a half open probe is already in flight
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+        return
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+        return
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            retry_in = max(self.cooldown - (time.monotonic() - self.opened_at), 0) if self.state == self.OPEN else 0
+            return dict(state=self.state, failures=self.failures, retry_in=round(retry_in, 1))
+
+
+class SiteHealth:
+    """ Breaker and bulkhead for each site, keyed by site id """
+    def __init__(self):
+        self.failure_threshold = DEFAULT_FAILURE_THRESHOLD
+        self.cooldown = DEFAULT_COOLDOWN
+        self.max_concurrent = DEFAULT_MAX_CONCURRENT
+        self._breakers: Dict[int, CircuitBreaker] = {}
+        self._bulkheads: Dict[int, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict) -> None:
+        """ Load breaker and bulkhead settings from app config, resets all sites """
+        self.failure_threshold = int(config.get('BURK_BREAKER_THRESHOLD', DEFAULT_FAILURE_THRESHOLD))
+        self.cooldown = float(config.get('BURK_BREAKER_COOLDOWN', DEFAULT_COOLDOWN))
+        self.max_concurrent = int(config.get('BURK_MAX_CONCURRENT', DEFAULT_MAX_CONCURRENT))
+        with self._lock:
+            self._breakers.clear()
+            self._bulkheads.clear()
+        return
+
+    def breaker(self, site_id: int) -> CircuitBreaker:
+        with self._lock:
+            if site_id not in self._breakers:
+                self._breakers[site_id] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self._breakers[site_id]
+
+    @contextmanager
+    def bulkhead(self, site_id: int):
+        """ Hold one of the site's request slots, raises BulkheadFullError without waiting if none are free """
+        with self._lock:
+            if site_id not in self._bulkheads:
+                self._bulkheads[site_id] = threading.BoundedSemaphore(self.max_concurrent)
+            semaphore = self._bulkheads[site_id]
+
+        if not semaphore.acquire(blocking=False):
+            raise BulkheadFullError(f'Site {site_id} already has {self.max_concurrent} requests waiting on its Burk')
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def call(self, site_id: int, fetch: Callable[[], Tuple[list, list]]) -> Tuple[list, list]:
+        """
+        Run a (meters, statuses) fetch through the site's breaker
+        A fetch returning no data at all counts as a failure
+        """
+        breaker = self.breaker(site_id)
+        if not breaker.allow():
+            raise CircuitOpenError(f'Burk for site {site_id} is unreachable, retrying in {breaker.to_dict()["retry_in"]}s')
+
+        meters, statuses = [], []
+        try:
+            meters, statuses = fetch()
+        finally:
+            self.record(site_id, bool(meters or statuses))
+        return meters, statuses
+
+    def allow(self, site_id: int) -> bool:
+        return self.breaker(site_id).allow()
+
+    def record(self, site_id: int, success: bool) -> None:
+        breaker = self.breaker(site_id)
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        return
+
+    def stats(self) -> Dict[int, dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {site_id: breaker.to_dict() for site_id, breaker in breakers.items()}
+
+
+# Shared by every request in the process
+site_health = SiteHealth()
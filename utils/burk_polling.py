@@ -0,0 +1,81 @@
+"""
+Shared Burk polling helpers
+Gathers snapshots for many sites through the cache, breakers and async client
+Sorts Burk meter and status values onto the channels configured for a site
+"""
+# ----- 3RD PARTY IMPORTS -----
+from flask import current_app
+# ----- BUILT IN IMPORTS -----
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+# ----- PROJECT IMPORTS -----
+from utils.arcplus_async import AsyncArcPlus, fetch_all_snapshots
+from utils.burk_cache import Snapshot, snapshot_cache
+from utils.burk_health import BulkheadFullError, site_health
+from utils.site_runtime import SiteRuntimeConfig
+
+
+def collect_snapshots(sites: List[SiteRuntimeConfig],
+                      refresh: bool = False,
+                      max_age: Optional[float] = None,
+                      jitter: float = 0.0) -> Dict[int, Snapshot]:
+    """
+    Snapshot for every site keyed by site id
+    Fresh cached snapshots are reused unless refresh, sites with an open breaker or no free bulkhead slot are
+    skipped, all other units are called concurrently and the results cached
+    """
+    snapshots = {}
+    units = {}
+    with ExitStack() as slots:
+        for site in sites:
+            cached = None if refresh else snapshot_cache.peek(site.id, max_age)
+            if cached:
+                snapshots[site.id] = cached
+                continue
+            try:
+                # held until the fleet call returns, same per-site limit as burk_api_call
+                slots.enter_context(site_health.bulkhead(site.id))
+            except BulkheadFullError:
+                snapshots[site.id] = Snapshot([], [])
+                continue
+            if not site_health.allow(site.id):
+                # breaker open, skip the unit rather than wait out its timeout
+                snapshots[site.id] = Snapshot([], [])
+            else:
+                units[site.id] = AsyncArcPlus(ip=site.ip_addr, api_key=site.api_key)
+
+        fetched = fetch_all_snapshots(units, jitter=jitter)
+
+    for site_id, (meters, statuses) in fetched.items():
+        snapshot = Snapshot(meters, statuses)
+        site_health.record(site_id, snapshot.connected)
+        if snapshot.connected:
+            snapshot_cache.store(site_id, snapshot)
+        snapshots[site_id] = snapshot
+    return snapshots
+
+
+# ----- BURK VALUE SORTING -----
+def get_burk_data(site: SiteRuntimeConfig, meters: list, statuses: list) -> List[dict]:
+    """ Copy of the site's serialized channels with the Burk value of each added """
+    data = []
+    for channel, burk_channels in zip(site.channels, site.burk_channels):
+        if channel['chan_type'] == 'meter':
+            meter_value = get_burk_value(channel, meters, burk_channels[0]) if burk_channels else None
+            data.append(dict(channel, value=meter_value))
+        elif channel['chan_type'] == 'status':
+            status_values = [get_burk_value(channel, statuses, burk_channel) for burk_channel in burk_channels]
+            data.append(dict(channel, value=status_values))
+    return data
+
+
+def get_burk_value(channel: dict, values: List[dict], burk_channel: int):
+    """ Value at a 1-indexed Burk channel, None if the option has no channel or the Burk did not return it """
+    if not burk_channel:
+        return None
+    try:
+        return values[burk_channel - 1]['value']
+    except IndexError:
+        current_app.logger.info(f"{channel['chan_type'].title()} Channel {channel['id']} "
+                                f"at Site {channel['site_id']} Burk Data index error")
+        return None
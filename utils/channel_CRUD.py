@@ -2,7 +2,7 @@
 import re
 from typing import List, Dict
 
-from models import Channel, MeterConfig, ReadingValue, StatusOption
+from models import Channel, LimitExcursion, MeterConfig, MeterDailyRollup, MeterSample, ReadingValue, StatusOption
 from extensions import db
 
 
@@ -81,6 +81,11 @@ def delete_channel(channel_id: int) -> None:
     for reading in reading_vals_to_del:
         db.session.delete(reading)
 
+    # delete polled telemetry for the channel
+    MeterSample.query.filter_by(channel_id=channel_to_delete.id).delete()
+    MeterDailyRollup.query.filter_by(channel_id=channel_to_delete.id).delete()
+    LimitExcursion.query.filter_by(channel_id=channel_to_delete.id).delete()
+
     # delete channel
     db.session.delete(channel_to_delete)
     db.session.commit()
@@ -1,9 +1,13 @@
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import tuple_
+from sqlalchemy.engine import Row
+
 # ---- BUILT IN IMPORTS -----
 from datetime import datetime
 from typing import List, Optional, Tuple
 
 # ----- PROJECT IMPORTS -----
-from models import EAS, Reading, Site
+from models import EAS, Reading, Site, SiteReading
 
 
 # ----- SQL Queries -----
@@ -23,6 +27,63 @@ def query_readings_by_date_range(dates: Tuple[datetime, datetime]) -> List[Readi
     return readings
 
 
+def query_latest_readings_for_site(site: Site, limit: int) -> List[Reading]:
+    """ Most recent readings with values for the site, newest first, read from the site_readings index """
+    return query_site_readings_before(site, limit)
+
+
+def query_site_readings_before(site: Site, limit: int, cursor: Optional[Tuple[datetime, int]] = None) -> List[Reading]:
+    """
+    Keyset page of the site's readings, newest first
+    Only readings older than the (timestamp, reading id) cursor are returned so every page is one index seek
+    """
+    query = Reading.query.join(
+        SiteReading, SiteReading.reading_id == Reading.id
+    ).filter(
+        SiteReading.site_id == site.id
+    )
+    if cursor:
+        query = query.filter(tuple_(SiteReading.timestamp, SiteReading.reading_id) < cursor)
+    readings = query.order_by(
+        SiteReading.timestamp.desc(), SiteReading.reading_id.desc()
+    ).limit(limit).all()
+    return readings
+
+
+def query_site_readings_in_range(dates: Tuple[datetime, datetime], site: Site, limit: int,
+                                 after: Optional[Tuple[datetime, int]] = None) -> List[Row]:
+    """
+    Keyset chunk of (id, timestamp, user_id) rows of the site's readings in the date range, oldest first
+    Only readings newer than the (timestamp, reading id) of after are returned, no ORM objects are built
+    """
+    query = Reading.query.join(
+        SiteReading, SiteReading.reading_id == Reading.id
+    ).with_entities(
+        Reading.id, Reading.timestamp, Reading.user_id
+    ).filter(
+        SiteReading.site_id == site.id,
+        SiteReading.timestamp >= dates[0],
+        SiteReading.timestamp <= dates[1]
+    )
+    if after:
+        query = query.filter(tuple_(SiteReading.timestamp, SiteReading.reading_id) > after)
+    rows = query.order_by(
+        SiteReading.timestamp.asc(), SiteReading.reading_id.asc()
+    ).limit(limit).all()
+    return rows
+
+
+def format_reading_cursor(reading: Reading) -> str:
+    """ Cursor for the page of readings after this one """
+    return f'{reading.timestamp.isoformat()}_{reading.id}'
+
+
+def parse_reading_cursor(cursor: str) -> Tuple[datetime, int]:
+    """ (timestamp, reading id) from format_reading_cursor output, raises ValueError if malformed """
+    timestamp, reading_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(reading_id)
+
+
 def query_eas_tests_by_date_range(dates: Tuple[datetime, datetime], site: Optional[Site] = None) -> List[EAS]:
     """ Queries SQL for EAS Tests transmitted on the site for a specific range of dates
     """
@@ -1,5 +1,7 @@
 """ Encryption for API KEYS """
 
+from functools import lru_cache
+
 from flask import current_app
 from cryptography.fernet import Fernet
 
@@ -25,5 +27,10 @@ def decrypt_api_key(api_key: bytes) -> str:
 
 def create_fernet_object() -> Fernet:
     encryption_key = current_app.config.get('ENCRYPTION_KEY')
-    fernet_obj = Fernet(encryption_key)
-    return fernet_obj
+    return get_fernet(encryption_key)
+
+
+@lru_cache(maxsize=4)
+def get_fernet(encryption_key: str) -> Fernet:
+    """ Fernet objects are reused for a key rather than rebuilt on every call """
+    return Fernet(encryption_key)
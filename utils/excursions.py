@@ -0,0 +1,122 @@
+"""
+Evaluates meter values against their channel limits when a reading is submitted
+Out of limit values are kept in the limit_excursions table so pages and reports look them up instead of re-checking
+"""
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import case, func, select
+# ----- BUILT IN IMPORTS -----
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import Channel, LimitExcursion, MeterConfig, Reading, ReadingValue, Site
+
+
+class MeterLimits(NamedTuple):
+    upper_limit: float
+    upper_lim_color: str
+    lower_limit: float
+    lower_lim_color: str
+
+
+def load_meter_limits(channel_ids: List[int]) -> Dict[int, MeterLimits]:
+    """ {channel_id: MeterLimits} from each channel's first meter config """
+    limits = {}
+    rows = MeterConfig.query.with_entities(
+        MeterConfig.channel_id, MeterConfig.upper_limit, MeterConfig.upper_lim_color,
+        MeterConfig.lower_limit, MeterConfig.lower_lim_color
+    ).filter(
+        MeterConfig.channel_id.in_(channel_ids)
+    ).order_by(MeterConfig.id.desc())
+    # ordered newest first so the first config of each channel is written last
+    for channel_id, *config in rows:
+        limits[channel_id] = MeterLimits(*config)
+    return limits
+
+
+def check_limits(value: float, limits: Optional[MeterLimits]) -> Optional[Tuple[str, float, str]]:
+    """ (limit type, limit value, color) if the value is at or beyond a limit, same rules as the readings form """
+    if limits is None:
+        return None
+    if value >= limits.upper_limit:
+        return 'upper', limits.upper_limit, limits.upper_lim_color
+    if value <= limits.lower_limit:
+        return 'lower', limits.lower_limit, limits.lower_lim_color
+    return None
+
+
+def record_excursions(reading: Reading) -> None:
+    """ Add an excursion row for each of the reading's meter values outside its limits, caller commits """
+    values = db.session.execute(
+        select(ReadingValue.channel_id, Channel.site_id, ReadingValue.numeric_value).join(
+            Channel, Channel.id == ReadingValue.channel_id
+        ).where(
+            ReadingValue.reading_id == reading.id,
+            ReadingValue.numeric_value.isnot(None)
+        )
+    ).all()
+    if not values:
+        return
+    limits = load_meter_limits([channel_id for channel_id, _, _ in values])
+
+    excursions = []
+    for channel_id, site_id, value in values:
+        excursion = check_limits(value, limits.get(channel_id))
+        if not excursion:
+            continue
+        limit_type, limit_value, color = excursion
+        excursions.append(LimitExcursion(
+            reading_id=reading.id, channel_id=channel_id, site_id=site_id, timestamp=reading.timestamp,
+            value=value, limit_type=limit_type, limit_value=limit_value, color=color
+        ))
+    db.session.add_all(excursions)
+    return
+
+
+def excursion_backfill():
+    """ INSERT ... SELECT adding excursions missing for stored readings, evaluated with current limits """
+    first_config = select(func.min(MeterConfig.id)).group_by(MeterConfig.channel_id)
+    value = ReadingValue.numeric_value
+    is_upper = value >= MeterConfig.upper_limit
+    is_lower = value <= MeterConfig.lower_limit
+    already_recorded = select(LimitExcursion.reading_id).where(
+        LimitExcursion.reading_id == ReadingValue.reading_id,
+        LimitExcursion.channel_id == ReadingValue.channel_id
+    ).exists()
+
+    excursions = select(
+        ReadingValue.reading_id,
+        ReadingValue.channel_id,
+        Channel.site_id,
+        Reading.timestamp,
+        value,
+        case((is_upper, 'upper'), else_='lower'),
+        case((is_upper, MeterConfig.upper_limit), else_=MeterConfig.lower_limit),
+        case((is_upper, MeterConfig.upper_lim_color), else_=MeterConfig.lower_lim_color)
+    ).join(
+        Channel, Channel.id == ReadingValue.channel_id
+    ).join(
+        Reading, Reading.id == ReadingValue.reading_id
+    ).join(
+        MeterConfig, (MeterConfig.channel_id == ReadingValue.channel_id) & MeterConfig.id.in_(first_config)
+    ).where(
+        value.isnot(None),
+        is_upper | is_lower,
+        ~already_recorded
+    )
+    return db.insert(LimitExcursion).from_select(
+        ['reading_id', 'channel_id', 'site_id', 'timestamp', 'value', 'limit_type', 'limit_value', 'color'],
+        excursions
+    )
+
+
+def query_site_excursions(site: Site, dates: Tuple[datetime, datetime]) -> List[LimitExcursion]:
+    """ Excursions of the site's meters in the date range, oldest first, one search of the (site_id, timestamp) index """
+    excursions = LimitExcursion.query.filter(
+        LimitExcursion.site_id == site.id,
+        LimitExcursion.timestamp >= dates[0],
+        LimitExcursion.timestamp <= dates[1]
+    ).order_by(
+        LimitExcursion.timestamp.asc()
+    ).all()
+    return excursions
@@ -0,0 +1,144 @@
+"""
+Live channel values pushed to browsers over Server-Sent Events
+One shared poll loop serves every connected viewer, each update only carries the channels that changed
+Every open stream holds a web server thread, so streams are capped and viewers past the cap poll /api/burk/all
+"""
+# ----- 3RD PARTY IMPORTS -----
+from flask import Flask
+# ----- BUILT IN IMPORTS -----
+import json
+import queue
+import threading
+import time
+from typing import Dict, Optional, Set
+# ----- PROJECT IMPORTS -----
+from utils.burk_polling import collect_snapshots, get_burk_data
+from utils.site_runtime import get_all_site_runtimes
+
+# Seconds between polls, overridden by FLASK_LIVE_FEED_INTERVAL
+DEFAULT_INTERVAL = 10.0
+# Open streams at once, overridden by FLASK_LIVE_FEED_MAX_STREAMS, keep below the web server's thread count
+DEFAULT_MAX_STREAMS = 2
+# Updates buffered for a viewer before it is resynced with the full state
+SUBSCRIBER_BUFFER = 50
+
+
+class LiveFeedFull(Exception):
+    """ Raised when max_streams viewers are already subscribed """
+
+
+class LiveFeed:
+    """
+    Polls all sites while at least one viewer is subscribed
+    state holds the last value of every channel as {site_id: {channel_id: value}}, None if the site is offline
+    """
+    def __init__(self, interval: float = DEFAULT_INTERVAL, max_streams: int = DEFAULT_MAX_STREAMS):
+        self.interval = interval
+        self.max_streams = max_streams
+        self.state: Dict[int, Optional[dict]] = {}
+        self._subscribers: Set[queue.Queue] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, config: dict) -> None:
+        self.interval = float(config.get('LIVE_FEED_INTERVAL', DEFAULT_INTERVAL))
+        self.max_streams = int(config.get('LIVE_FEED_MAX_STREAMS', DEFAULT_MAX_STREAMS))
+        return
+
+    def subscribe(self, app: Flask) -> queue.Queue:
+        """ Register a viewer, its queue starts with the full current state, raises LiveFeedFull past max_streams """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                raise LiveFeedFull(f'{len(self._subscribers)} live streams are already open')
+            subscriber.put_nowait(self._full_state_event())
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(app,), name='live-feed', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        return
+
+    def _run(self, app: Flask) -> None:
+        """ Poll until the last viewer leaves """
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                with app.app_context():
+                    self.poll()
+            except Exception as e:
+                app.logger.error(f'Live feed poll failed: {e}')
+            time.sleep(self.interval)
+
+    def poll(self) -> None:
+        """ Read every site once and publish a diff for each site whose values changed """
+        sites = get_all_site_runtimes()
+        snapshots = collect_snapshots(sites, max_age=self.interval)
+
+        for site in sites:
+            snapshot = snapshots[site.id]
+            if not snapshot.connected:
+                values = None
+            else:
+                channels = get_burk_data(site, snapshot.meters, snapshot.statuses)
+                values = {channel['id']: channel['value'] for channel in channels}
+
+            # request threads read state under the lock while subscribing or resyncing a viewer
+            with self._lock:
+                diff = diff_site_values(self.state.get(site.id), values)
+                self.state[site.id] = values
+            if diff is not None:
+                self.publish(dict(type='update', site_id=site.id, **diff))
+        return
+
+    def publish(self, event: dict) -> None:
+        with self._lock:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    # viewer fell behind, replace its backlog with the full state
+                    drain(subscriber)
+                    subscriber.put_nowait(self._full_state_event())
+        return
+
+    def _full_state_event(self) -> dict:
+        return dict(type='snapshot', sites={site_id: values for site_id, values in self.state.items()})
+
+
+def diff_site_values(previous: Optional[dict], current: Optional[dict]) -> Optional[dict]:
+    """
+    Changes between two polls of a site
+    Returns None if nothing changed, connected=False if the site went offline, else the changed channels only
+    """
+    if current is None:
+        return None if previous is None else dict(connected=False)
+    changed = {channel_id: value for channel_id, value in current.items()
+               if previous is None or previous.get(channel_id) != value}
+    if not changed and previous is not None:
+        return None
+    return dict(connected=True, channels=changed)
+
+
+def drain(subscriber: queue.Queue) -> None:
+    while True:
+        try:
+            subscriber.get_nowait()
+        except queue.Empty:
+            return
+
+
+def format_sse(event: dict) -> str:
+    """ Serialize an event in the text/event-stream format """
+    return f"data: {json.dumps(event)}\n\n"
+
+
+# Shared by every viewer in the process
+live_feed = LiveFeed()
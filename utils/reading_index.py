@@ -0,0 +1,48 @@
+""" Maintains the site_readings index of which sites have values in each reading """
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import select
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import Channel, Reading, ReadingValue, SiteReading
+
+
+def record_site_readings(reading: Reading) -> None:
+    """ Add index rows for each site that has values in the reading, caller commits """
+    site_ids = db.session.execute(
+        select(Channel.site_id).join(
+            ReadingValue, ReadingValue.channel_id == Channel.id
+        ).where(
+            ReadingValue.reading_id == reading.id
+        ).distinct()
+    ).scalars().all()
+
+    db.session.add_all([
+        SiteReading(site_id=site_id, reading_id=reading.id, timestamp=reading.timestamp)
+        for site_id in site_ids
+    ])
+    return
+
+
+def backfill_site_readings() -> int:
+    """ Index every existing reading that is missing from site_readings, returns rows added """
+    result = db.session.execute(site_readings_backfill())
+    db.session.commit()
+    return result.rowcount
+
+
+def site_readings_backfill():
+    """ INSERT ... SELECT statement adding the site_readings rows that are missing """
+    already_indexed = select(SiteReading.reading_id).where(
+        SiteReading.site_id == Channel.site_id,
+        SiteReading.reading_id == ReadingValue.reading_id
+    ).exists()
+    missing = select(
+        Channel.site_id, ReadingValue.reading_id, Reading.timestamp
+    ).join(
+        Channel, Channel.id == ReadingValue.channel_id
+    ).join(
+        Reading, Reading.id == ReadingValue.reading_id
+    ).where(
+        ~already_indexed
+    ).distinct()
+    return db.insert(SiteReading).from_select(['site_id', 'reading_id', 'timestamp'], missing)
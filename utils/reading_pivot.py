@@ -0,0 +1,127 @@
+"""
+Wide reading x channel table of a site built in SQL
+Each reading is one row of (reading id, timestamp, user name, notes, value per channel, number per channel) pivoted
+by conditional aggregation over SQLAlchemy Core, no ORM objects are built
+"""
+# ----- 3RD PARTY IMPORTS -----
+import numpy as np
+from sqlalchemy import case, func, select
+# ----- BUILT IN IMPORTS -----
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Tuple
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import Reading, ReadingValue, Site, SiteReading, User
+
+# Leading columns of every row before the channel values
+ID, TIMESTAMP, USER, NOTES = range(4)
+FIRST_VALUE = 4
+
+
+@dataclass
+class ReadingTable:
+    """
+    Pivoted readings of a site, rows are plain tuples so the table can be pickled or cached
+    Channel values are the submitted strings, None where a reading has no value for the channel
+    They are followed by the stored numeric value of each channel, None for statuses and non-numeric meter input
+    """
+    channel_ids: Tuple[int, ...]
+    titles: Tuple[str, ...]
+    chan_types: Tuple[str, ...]
+    rows: List[tuple]
+
+    @property
+    def headers(self) -> List[str]:
+        """ Column headers of the PDF reading table """
+        return ['Timestamp'] + list(self.titles) + ['MCEOD']
+
+    def column(self, index: int) -> tuple:
+        """ Values of one row position across the table """
+        return tuple(row[index] for row in self.rows)
+
+    def timestamps(self) -> np.ndarray:
+        """ Reading timestamps as datetime64 """
+        return np.array(self.column(TIMESTAMP), dtype='datetime64[us]')
+
+    def values(self, channel_index: int) -> tuple:
+        """ Values of the channel at channel_index in channel order """
+        return self.column(FIRST_VALUE + channel_index)
+
+    def numbers(self, channel_index: int) -> tuple:
+        """ Stored numeric values of the channel at channel_index """
+        return self.column(FIRST_VALUE + len(self.channel_ids) + channel_index)
+
+    def meter_array(self, channel_index: int) -> np.ndarray:
+        """ Float values of a channel, NaN where missing or not a number, no parsing needed """
+        return np.array(self.numbers(channel_index), dtype=float)
+
+    def meter_indexes(self) -> List[int]:
+        """ Positions of the meter channels """
+        return [i for i, chan_type in enumerate(self.chan_types) if chan_type == 'meter']
+
+    def between(self, start: datetime, end: datetime) -> 'ReadingTable':
+        """ Table of the rows timestamped from start to end inclusive, rows are ordered so no scan is needed """
+        timestamps = self.column(TIMESTAMP)
+        rows = self.rows[bisect_left(timestamps, start):bisect_right(timestamps, end)]
+        return ReadingTable(self.channel_ids, self.titles, self.chan_types, rows)
+
+
+def query_reading_table(site: Site, dates: Tuple[datetime, datetime]) -> ReadingTable:
+    """
+    Readings of the site in the date range with at least one value for the site, oldest first
+    One query driven by the site_readings index, the pivot happens in the database
+    """
+    channels = list(site.channels)
+    channel_ids = tuple(channel.id for channel in channels)
+    table = ReadingTable(
+        channel_ids=channel_ids,
+        titles=tuple(channel.title for channel in channels),
+        chan_types=tuple(channel.chan_type for channel in channels),
+        rows=[]
+    )
+    if not channel_ids:
+        return table
+
+    value_columns = [
+        func.max(case((ReadingValue.channel_id == channel_id, ReadingValue.reading_value))).label(f'ch_{channel_id}')
+        for channel_id in channel_ids
+    ]
+    number_columns = [
+        func.max(case((ReadingValue.channel_id == channel_id, ReadingValue.numeric_value))).label(f'num_{channel_id}')
+        for channel_id in channel_ids
+    ]
+    statement = select(
+        Reading.id, Reading.timestamp, user_name_column(), Reading.notes, *value_columns, *number_columns
+    ).select_from(
+        SiteReading
+    ).join(
+        Reading, Reading.id == SiteReading.reading_id
+    ).join(
+        ReadingValue, ReadingValue.reading_id == SiteReading.reading_id
+    ).outerjoin(
+        User, User.id == Reading.user_id
+    ).where(
+        SiteReading.site_id == site.id,
+        SiteReading.timestamp >= dates[0],
+        SiteReading.timestamp <= dates[1],
+        ReadingValue.channel_id.in_(channel_ids)
+    ).group_by(
+        SiteReading.timestamp, SiteReading.reading_id
+    ).order_by(
+        SiteReading.timestamp, SiteReading.reading_id
+    )
+
+    table.rows = [tuple(row) for row in db.session.execute(statement)]
+    return table
+
+
+def user_name_column():
+    """ User.name computed in SQL, [DELETED] when the user no longer exists """
+    full_name = case(
+        (func.coalesce(User.last_name, '') == '', User.first_name),
+        else_=User.first_name + ' ' + User.last_name
+    )
+    return func.coalesce(full_name, '[DELETED]').label('user')
+
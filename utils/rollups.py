@@ -0,0 +1,189 @@
+"""
+Maintains the meter_daily_rollups table of per channel, per day reading totals
+Updated as readings are submitted and rebuildable from the raw reading values
+"""
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import bindparam, case, func, select
+# ----- BUILT IN IMPORTS -----
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import Channel, MeterConfig, MeterDailyRollup, Reading, ReadingValue, Site
+from utils.excursions import load_meter_limits
+
+
+@dataclass
+class RollupSummary:
+    """ Meter channel statistics over a range of days """
+    channel_id: int
+    count: int
+    minimum: float
+    maximum: float
+    mean: float
+    std_dev: float
+    above_upper: int
+    below_lower: int
+
+
+def update_daily_rollups(reading: Reading) -> None:
+    """
+    Add the reading's meter values to their channel's rollup for the reading's day, caller commits
+    Missing rollup rows are inserted and existing ones incremented, each with a single executemany
+    """
+    values = db.session.execute(
+        select(ReadingValue.channel_id, ReadingValue.numeric_value).where(
+            ReadingValue.reading_id == reading.id,
+            ReadingValue.numeric_value.isnot(None)
+        )
+    ).all()
+    if not values:
+        return
+    channel_ids = [channel_id for channel_id, _ in values]
+    limits = load_meter_limits(channel_ids)
+    day = reading.timestamp.date()
+    existing = set(db.session.execute(
+        select(MeterDailyRollup.channel_id).where(
+            MeterDailyRollup.channel_id.in_(channel_ids),
+            MeterDailyRollup.day == day
+        )
+    ).scalars())
+
+    inserts, updates = [], []
+    for channel_id, value in values:
+        channel_limits = limits.get(channel_id)
+        above = int(channel_limits is not None and value >= channel_limits.upper_limit)
+        below = int(channel_limits is not None and value <= channel_limits.lower_limit)
+        if channel_id in existing:
+            updates.append(dict(b_channel_id=channel_id, b_value=value, b_above=above, b_below=below))
+        else:
+            inserts.append(dict(
+                channel_id=channel_id, day=day, count=1, min_value=value, max_value=value, sum_value=value,
+                sum_squares=value * value, above_upper=above, below_lower=below
+            ))
+
+    if inserts:
+        db.session.execute(db.insert(MeterDailyRollup), inserts)
+    if updates:
+        db.session.connection().execute(_increment_rollup(day), updates)
+    return
+
+
+def _increment_rollup(day):
+    """ Core UPDATE adding one value to a channel's rollup, executed with b_channel_id, b_value, b_above, b_below """
+    rollups = MeterDailyRollup.__table__
+    value = bindparam('b_value')
+    return rollups.update().where(
+        rollups.c.channel_id == bindparam('b_channel_id'),
+        rollups.c.day == day
+    ).values(
+        count=rollups.c.count + 1,
+        min_value=case((rollups.c.min_value > value, value), else_=rollups.c.min_value),
+        max_value=case((rollups.c.max_value < value, value), else_=rollups.c.max_value),
+        sum_value=rollups.c.sum_value + value,
+        sum_squares=rollups.c.sum_squares + value * value,
+        above_upper=rollups.c.above_upper + bindparam('b_above'),
+        below_lower=rollups.c.below_lower + bindparam('b_below')
+    )
+
+
+def rebuild_daily_rollups(site_id: Optional[int] = None) -> int:
+    """
+    Recompute rollups from raw reading values for every meter channel, or only the site's channels
+    Limit counts use each channel's current meter config, returns rollup rows written
+    """
+    delete, insert = rebuild_statements(site_id)
+    db.session.execute(delete)
+    result = db.session.execute(insert)
+    db.session.commit()
+    return result.rowcount
+
+
+def rebuild_statements(site_id: Optional[int] = None):
+    """ (DELETE, INSERT ... SELECT) statements that rebuild the rollups """
+    channels = select(Channel.id).where(Channel.chan_type == 'meter')
+    if site_id is not None:
+        channels = channels.where(Channel.site_id == site_id)
+    delete = db.delete(MeterDailyRollup).where(MeterDailyRollup.channel_id.in_(channels))
+
+    # first meter config of each channel
+    first_config = select(func.min(MeterConfig.id)).group_by(MeterConfig.channel_id)
+    value = ReadingValue.numeric_value
+    day = func.date(Reading.timestamp)
+    totals = select(
+        ReadingValue.channel_id,
+        day,
+        func.count(value),
+        func.min(value),
+        func.max(value),
+        func.sum(value),
+        func.sum(value * value),
+        func.sum(case((value >= MeterConfig.upper_limit, 1), else_=0)),
+        func.sum(case((value <= MeterConfig.lower_limit, 1), else_=0))
+    ).join(
+        Reading, Reading.id == ReadingValue.reading_id
+    ).outerjoin(
+        MeterConfig, (MeterConfig.channel_id == ReadingValue.channel_id) & MeterConfig.id.in_(first_config)
+    ).where(
+        ReadingValue.channel_id.in_(channels),
+        value.isnot(None)
+    ).group_by(
+        ReadingValue.channel_id, day
+    )
+    insert = db.insert(MeterDailyRollup).from_select(
+        ['channel_id', 'day', 'count', 'min_value', 'max_value', 'sum_value', 'sum_squares', 'above_upper',
+         'below_lower'],
+        totals
+    )
+    return delete, insert
+
+
+def query_rollup_summaries(site: Site, dates: Tuple[datetime, datetime]) -> List[RollupSummary]:
+    """
+    Statistics of each meter channel of the site over the days in the date range
+    Reads one rollup row per channel per day, ranges are widened to whole days
+    """
+    return query_sites_rollup_summaries([site.id], dates).get(site.id, [])
+
+
+def query_sites_rollup_summaries(site_ids: List[int],
+                                 dates: Tuple[datetime, datetime]) -> Dict[int, List[RollupSummary]]:
+    """ {site_id: summaries} of query_rollup_summaries for many sites in one query """
+    rows = db.session.execute(
+        select(
+            Channel.site_id,
+            MeterDailyRollup.channel_id,
+            func.sum(MeterDailyRollup.count),
+            func.min(MeterDailyRollup.min_value),
+            func.max(MeterDailyRollup.max_value),
+            func.sum(MeterDailyRollup.sum_value),
+            func.sum(MeterDailyRollup.sum_squares),
+            func.sum(MeterDailyRollup.above_upper),
+            func.sum(MeterDailyRollup.below_lower)
+        ).join(
+            Channel, Channel.id == MeterDailyRollup.channel_id
+        ).where(
+            Channel.site_id.in_(site_ids),
+            MeterDailyRollup.day >= dates[0].date(),
+            MeterDailyRollup.day <= dates[1].date()
+        ).group_by(
+            Channel.site_id, MeterDailyRollup.channel_id
+        )
+    ).all()
+
+    summaries = {}
+    for site_id, channel_id, count, minimum, maximum, total, squares, above, below in rows:
+        mean = total / count
+        summaries.setdefault(site_id, []).append(RollupSummary(
+            channel_id=channel_id,
+            count=count,
+            minimum=minimum,
+            maximum=maximum,
+            mean=mean,
+            std_dev=math.sqrt(max(squares / count - mean * mean, 0.0)),
+            above_upper=above,
+            below_lower=below
+        ))
+    return summaries
@@ -0,0 +1,168 @@
+"""
+Precompiled per-site configuration for the Burk polling hot path
+Holds the decrypted API key, serialized channels and burk channel mapping so polling never touches the ORM
+Also holds the compiled matcher that routes auto-generated reading messages to sites by display name
+Admin routes call invalidate_site_runtime whenever a site or its channels change
+Each invalidation bumps a generation, a config loaded before the bump is returned to its caller but never cached
+"""
+# ----- BUILT IN IMPORTS -----
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from models import Site
+from models.schemas import ChannelSchema
+from utils.encryption import decrypt_api_key
+
+
+@dataclass(frozen=True)
+class SiteRuntimeConfig:
+    """
+    channels are ChannelSchema dumps in site order
+    burk_channels lines up with channels: (burk_channel,) for a meter, one burk channel per option for a status
+    """
+    id: int
+    site_name: str
+    display_name: str
+    ip_addr: str
+    api_key: str
+    channels: Tuple[dict, ...]
+    burk_channels: Tuple[Tuple[int, ...], ...]
+    config_version: str
+
+    def meter_channels(self) -> List[Tuple[int, int]]:
+        """ (channel id, burk channel) pairs of the site's meters """
+        return [
+            (channel['id'], burk_channels[0])
+            for channel, burk_channels in zip(self.channels, self.burk_channels)
+            if channel['chan_type'] == 'meter' and burk_channels
+        ]
+
+
+class SiteMatcher:
+    """
+    Single alternation regex of every site's display name, longest names first
+    A message belongs to the site named at its leftmost match, the longest name wins where names share a prefix
+    """
+    def __init__(self, sites: List[Tuple[int, str]]):
+        self.site_ids = {display_name: site_id for site_id, display_name in sites}
+        names = sorted(self.site_ids, key=len, reverse=True)
+        alternation = '|'.join(re.escape(name) for name in names)
+        # names only match whole words so one site's name inside another word is ignored
+        self.pattern = re.compile(rf'(?<!\w)(?:{alternation})(?!\w)') if names else None
+
+    def match(self, message: str) -> Optional[int]:
+        """ Site id of the site the message names, None if it names no site """
+        if self.pattern is None:
+            return None
+        found = self.pattern.search(message)
+        return self.site_ids[found.group(0)] if found else None
+
+
+_runtimes: Dict[int, SiteRuntimeConfig] = {}
+_site_order: Optional[List[int]] = None
+_matcher: Optional[SiteMatcher] = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def get_site_runtime(site_id: int) -> Optional[SiteRuntimeConfig]:
+    """ Runtime config for a site, compiled from the database on first use. None if no such site """
+    with _lock:
+        runtime = _runtimes.get(site_id)
+        generation = _generation
+    if runtime:
+        return runtime
+
+    site = Site.query.get(site_id)
+    if not site:
+        return None
+    runtime = compile_site_runtime(site)
+    with _lock:
+        # an admin edit committed while compiling may not be in this config
+        if generation == _generation:
+            _runtimes[site_id] = runtime
+    return runtime
+
+
+def get_all_site_runtimes() -> List[SiteRuntimeConfig]:
+    """ Runtime configs for every site in site_order """
+    global _site_order
+    with _lock:
+        site_order = _site_order
+        generation = _generation
+    if site_order is None:
+        site_order = [site_id for site_id, in Site.query.order_by(Site.site_order.asc()).with_entities(Site.id)]
+        with _lock:
+            if generation == _generation:
+                _site_order = site_order
+
+    runtimes = [get_site_runtime(site_id) for site_id in site_order]
+    return [runtime for runtime in runtimes if runtime]
+
+
+def get_site_matcher() -> SiteMatcher:
+    """ Message matcher over every site's display name, compiled on first use and after any site change """
+    global _matcher
+    with _lock:
+        matcher = _matcher
+        generation = _generation
+    if matcher is None:
+        matcher = SiteMatcher([(site.id, site.display_name) for site in Site.query.all()])
+        with _lock:
+            # a site added or renamed while compiling would otherwise be missing until the next edit
+            if generation == _generation:
+                _matcher = matcher
+    return matcher
+
+
+def invalidate_site_runtime(site_id: Optional[int] = None) -> None:
+    """ Drop a site's compiled config, or every site's when site_id is None """
+    global _site_order, _matcher, _generation
+    with _lock:
+        _generation += 1
+        _site_order = None
+        _matcher = None
+        if site_id is None:
+            _runtimes.clear()
+        else:
+            _runtimes.pop(site_id, None)
+    return
+
+
+def compile_site_runtime(site: Site) -> SiteRuntimeConfig:
+    """ Serialize the site's channels once and work out where each channel's values sit in the Burk data """
+    channels = sorted(ChannelSchema(many=True).dump(site.channels), key=lambda channel: channel['channel_order'])
+
+    burk_channels = []
+    for channel in channels:
+        if channel['chan_type'] == 'meter':
+            burk_channels.append(tuple(config['burk_channel'] for config in channel['meter_config'][:1]))
+        else:
+            burk_channels.append(tuple(option['burk_channel'] for option in channel['status_options']))
+
+    return SiteRuntimeConfig(
+        id=site.id,
+        site_name=site.site_name,
+        display_name=site.display_name,
+        ip_addr=site.ip_addr,
+        api_key=decrypt_api_key(site.api_key),
+        channels=tuple(channels),
+        burk_channels=tuple(burk_channels),
+        config_version=hash_config(site, channels)
+    )
+
+
+def site_config_version(site: Site) -> str:
+    """ Config version of a site read from the database, does not depend on this process's cached runtimes """
+    channels = sorted(ChannelSchema(many=True).dump(site.channels), key=lambda channel: channel['channel_order'])
+    return hash_config(site, channels)
+
+
+def hash_config(site: Site, channels: List[dict]) -> str:
+    """ Digest of the site's channel configuration, changes whenever an admin edits the site or its channels """
+    config = dict(site_name=site.site_name, ip_addr=site.ip_addr, channels=channels)
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
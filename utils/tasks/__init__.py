@@ -1,5 +1,9 @@
 """
 Package imports
 """
+from utils.tasks.csv_export import stream_readings_csv
 from utils.tasks.dasdec_parse import parse_dasdec_logs
 from utils.tasks.pdf_generation import create_pdf
+from utils.tasks.report_cache import report_cache, report_cache_key
+from utils.tasks.report_jobs import JobQueueFull, report_jobs
+from utils.tasks.telemetry_sampler import start_telemetry_sampler
@@ -0,0 +1,66 @@
+"""
+Stream a site's readings over a date range as CSV
+Readings are read in keyset chunks and written out chunk by chunk so memory stays flat for multi-year ranges
+"""
+# ----- BUILT IN IMPORTS -----
+import csv
+from datetime import datetime
+from io import StringIO
+from typing import Iterator, Tuple
+
+# ----- PROJECT IMPORTS -----
+from models import Site
+from utils.database_queries import query_site_readings_in_range
+from utils.validate_readings import load_reading_values, load_user_names
+
+# Readings read from the database per query
+EXPORT_CHUNK_SIZE = 1000
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def stream_readings_csv(site: Site,
+                        date_range: Tuple[datetime, datetime],
+                        chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    CSV text of the site's readings, columns match the PDF reading table: Timestamp, one per channel, MCEOD
+    Yields the header then one block of rows per chunk of readings
+    """
+    channels = list(site.channels)
+    channel_ids = [channel.id for channel in channels]
+
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Timestamp'] + [channel.title for channel in channels] + ['MCEOD'])
+    yield drain(buffer)
+
+    after = None
+    while True:
+        readings = query_site_readings_in_range(date_range, site, chunk_size, after)
+        if not readings:
+            break
+
+        values = load_reading_values([reading.id for reading in readings], channel_ids)
+        user_names = load_user_names({reading.user_id for reading in readings})
+        for reading in readings:
+            reading_values = values.get(reading.id)
+            # skip readings with no values for the site, as the PDF does
+            if not reading_values:
+                continue
+            writer.writerow(
+                [reading.timestamp.strftime(TIMESTAMP_FORMAT)]
+                + [reading_values.get(channel_id, 'N/A') for channel_id in channel_ids]
+                + [user_names.get(reading.user_id, '[DELETED]')]
+            )
+        yield drain(buffer)
+
+        if len(readings) < chunk_size:
+            break
+        after = (readings[-1].timestamp, readings[-1].id)
+
+
+def drain(buffer: StringIO) -> str:
+    """ Return and clear the buffer contents """
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
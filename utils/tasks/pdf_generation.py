@@ -2,7 +2,7 @@
 # ----- 3RD PARTY IMPORTS -----
 from reportlab.platypus import (BaseDocTemplate, Frame, Image, NextPageTemplate,
                                 PageBreak, PageTemplate, Paragraph, Table)
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.pagesizes import legal, landscape
 from reportlab.lib.units import inch
 from reportlab.lib import colors
@@ -12,51 +12,58 @@ from matplotlib.figure import Figure
 
 # ----- BUILT IN IMPORTS ----
 from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
-from typing import Tuple, List, Optional
+from typing import Callable, Dict, Tuple, List, Optional
 
 # ----- PROJECT IMPORTS -----
-from models import EAS, Channel, Site
-from utils import get_valid_readings
-from utils.datetime_manipulation import create_list_of_individual_dates
-from utils.database_queries import query_readings_by_date, query_readings_by_date_range, query_eas_tests_by_date_range
+from models import EAS, Site
+from utils.database_queries import query_eas_tests_by_date_range
+from utils.reading_pivot import FIRST_VALUE, ID, NOTES, TIMESTAMP, USER, ReadingTable
+from utils.tasks.report_data import SiteReportData, gather_report_data
 
 
 def create_pdf(site: Site,
                date_range: Tuple[datetime, datetime]) -> bytes:
     """ Create pdf of site readings """
+    return build_pdf(gather_report_data(site, date_range))
+
+
+def build_pdf(site_data: SiteReportData,
+              progress: Optional[Callable[..., None]] = None) -> bytes:
+    """
+    Lay out the report from data gathered up front, runs no queries
+    progress is called with days_rendered after each date's pages and chart_done once the chart is drawn
+    """
     # create pdf document
     buffer = BytesIO()
     doc = create_pdf_document(buffer)
     styles = define_styles()
-
-    # Gather all dates from start date up to end date
-    dates = create_list_of_individual_dates(*date_range)
+    date_range = site_data.date_range
 
     # Define common elements of each page
     date_range_subheader = f'{date_range[0].strftime("%B %d, %Y")} - {date_range[1].strftime("%B %d, %Y")}'
     report_data = dict(
-        title=Paragraph(f'<u>{site.site_name.replace("_", " ")} Report</u>', styles['title']),
+        title=Paragraph(f'<u>{site_data.site_name.replace("_", " ")} Report</u>', styles['title']),
         subheader=Paragraph(date_range_subheader, styles['subheader']),
         styles=styles
     )
 
     # Define dataframe headers
-    readings_headers = ['Timestamp'] + [channel.title for channel in site.channels] + ['MCEOD']
     message_headers = ['Timestamp', 'Messages', 'User Notes']
 
     report = []
-    for i, date in enumerate(dates):
-        # Query database for data on a given date
-        readings_for_date = query_readings_by_date(date)
-        readings_data_for_date = get_valid_readings(readings_for_date, site)
+    for days_rendered, date in enumerate(site_data.dates, start=1):
+        # Readings of the date sliced from the range fetched up front
+        day_table = site_data.day_table(date)
 
-        # create table of readings on specific date
-        readings_df = create_readings_dataframe(readings_headers, readings_data_for_date)
-        readings_table = create_table_from_readings_dataframe(readings_df, styles, site.channels)
+        # create table of readings on specific date, out of limit cells colored from the recorded excursions
+        readings_df = create_readings_dataframe_from_table(day_table)
+        cell_colors = site_data.cell_colors(day_table)
+        readings_table = create_table_from_readings_dataframe(readings_df, styles, cell_colors)
 
-        # Gather message data from database
-        message_df = create_message_dataframe(message_headers, readings_data_for_date)
+        # Gather message data of the date's readings
+        message_df = create_message_dataframe(message_headers, day_table, site_data.messages)
 
         # Remove rows from dataframe if no input. If no rows, do not create blank page of messages.
         message_df = remove_df_rows_w_no_data(['Messages', 'User Notes'], message_df)
@@ -66,25 +73,33 @@ def create_pdf(site: Site,
         report_for_date = build_report_for_date(report_data, readings_table, message_df)
         report += report_for_date
 
-        # TODO: Move this after EAS Report
-        # If last page of readings, change template otherwise start a new page
-        apply_histogram_formatting = [NextPageTemplate('figure'), PageBreak()]
-        report += apply_histogram_formatting if i == (len(dates) - 1) else [PageBreak()]
+        report += [PageBreak()]
+        if progress:
+            progress(days_rendered=days_rendered)
+
+    # Summary of meter channels over the whole range, read from the daily rollups
+    report += build_summary_report(report_data, site_data)
+
+    # TODO: Move this after EAS Report
+    # Change template for the histogram page
+    report += [NextPageTemplate('figure'), PageBreak()]
 
     # TODO: Implement report page with EAS Tests
     # Add EAS page with same formatting as report
-    eas_report = build_eas_report(site, date_range)
+    # eas_report = build_eas_report(site, date_range)
     # report += eas_report
     #
     # # Applies page formatting for the histogram
     # report += [NextPageTemplate('figure'), PageBreak()]
 
     # Add time series data of meter channels to report
-    histogram = build_histogram(site, date_range)
+    histogram = build_histogram(site_data)
     if histogram:
         report += [
             figure_to_image(histogram)
         ]
+    if progress:
+        progress(chart_done=True)
 
     # Create document with settings at pdf_path location
     doc.build(report)
@@ -106,28 +121,35 @@ def create_pdf_document(pdf_path: BytesIO) -> BaseDocTemplate:
     return pdf_doc
 
 
-def define_templates() -> List[PageTemplate]:
-    """ Create templates for the document """
-    # define onPage functions
-    def add_page_number(canvas, doc):
-        page_num = canvas.getPageNumber()
-        canvas.drawString(40, 20, f"Page {page_num}")
+# onPage functions of the templates
+def add_page_number(canvas, doc):
+    page_num = canvas.getPageNumber()
+    canvas.drawString(40, 20, f"Page {page_num}")
+
+
+def add_approval(canvas, doc):
+    canvas.setFont('Helvetica-Bold', 16)
+    approved = "Approved by: __________________________"
+    canvas.drawString(8.75 * inch, 20, approved)
 
-    def add_approval(canvas, doc):
-        canvas.setFont('Helvetica-Bold', 16)
-        approved = "Approved by: __________________________"
-        canvas.drawString(8.75 * inch, 20, approved)
 
-    padding = dict(
-        leftPadding=40,
-        rightPadding=40,
-        topPadding=24,
-        bottomPadding=30)
+PAGE_SIZE = landscape(legal)
+PAGE_PADDING = dict(
+    leftPadding=40,
+    rightPadding=40,
+    topPadding=24,
+    bottomPadding=30)
 
-    page_size = landscape(legal)
+
+def define_templates() -> List[PageTemplate]:
+    """
+    Create templates for the document
+    Frames track the flowables placed on them while a document builds, so each document gets its own templates
+    """
+    page_size = PAGE_SIZE
 
     # define frames
-    padded_frame = Frame(0, 0, *page_size, **padding, )
+    padded_frame = Frame(0, 0, *page_size, **PAGE_PADDING)
     fullpage_frame = Frame(0, 0, *page_size)
 
     base_template = PageTemplate(
@@ -148,8 +170,9 @@ def define_templates() -> List[PageTemplate]:
     return [base_template, figure_template]
 
 
-def define_styles() -> dict:
-    """ Define styles for the document """
+@lru_cache(maxsize=None)
+def define_styles() -> StyleSheet1:
+    """ Define styles for the document, built once per process and shared read only by every report """
     # get general styles
     styles = getSampleStyleSheet()
 
@@ -190,17 +213,53 @@ def create_readings_dataframe(headers: List[str],
     return pd.DataFrame.from_records(rows, columns=headers)
 
 
+def create_readings_dataframe_from_table(table: ReadingTable) -> pd.DataFrame:
+    """ Same dataframe as create_readings_dataframe built from the pivoted reading table """
+    channel_count = len(table.channel_ids)
+    rows = []
+    for row in table.rows:
+        timestamp = row[TIMESTAMP].strftime("%m/%d/%Y, %H:%M")
+        channel_values = []
+        values = row[FIRST_VALUE:FIRST_VALUE + channel_count]
+        numbers = row[FIRST_VALUE + channel_count:]
+        for value, number in zip(values, numbers):
+            # meter values are already stored as numbers
+            if number is not None:
+                channel_values.append(number)
+                continue
+            if value is None:
+                channel_values.append('N/A')
+                continue
+            try:
+                channel_values.append(float(value))
+            except ValueError:
+                channel_values.append(value)
+        rows.append([timestamp] + channel_values + [row[USER]])
+
+    return pd.DataFrame.from_records(rows, columns=table.headers)
+
+
+def create_meter_dataframe(table: ReadingTable) -> pd.DataFrame:
+    """ Timestamp column and a float column per meter channel, loaded straight from the table's columns """
+    meter_indexes = table.meter_indexes()
+    columns = [table.titles[i] for i in meter_indexes]
+    df = pd.DataFrame(np.column_stack([table.meter_array(i) for i in meter_indexes]), columns=columns)
+    df.insert(0, 'Timestamp', table.timestamps())
+    return df
+
+
 def create_message_dataframe(headers: List[str],
-                             readings: List[dict]) -> pd.DataFrame:
-    """ Create pandas dataframe for Message page """
+                             table: ReadingTable,
+                             messages: Dict[int, List[str]]) -> pd.DataFrame:
+    """ Create pandas dataframe for Message page, messages maps reading id to the site's messages """
     rows = []
-    for row in readings:
+    for row in table.rows:
         # Adding * and index[0] blank to force formatting in format_df_rows()
-        messages = '*'.join([' '] + row.get('messages'))
-        notes = '*'.join([' '] + [row.get('notes')])
-        timestamp = row.get('timestamp').strftime("%m/%d/%Y, %H:%M")
+        messages_text = '*'.join([' '] + messages.get(row[ID], []))
+        notes = '*'.join([' '] + [row[NOTES]])
+        timestamp = row[TIMESTAMP].strftime("%m/%d/%Y, %H:%M")
 
-        reading_data = [timestamp, messages, notes]
+        reading_data = [timestamp, messages_text, notes]
         rows.append(reading_data)
 
     return pd.DataFrame.from_records(rows, columns=headers)
@@ -220,11 +279,11 @@ def remove_df_rows_w_no_data(headers: List[str],
 # ----- REPORTLAB TABLE CREATION -----
 def create_table_from_readings_dataframe(df: pd.DataFrame,
                                          styles: dict,
-                                         channels: List[Channel]) -> Table:
-    """ Create a ReportLab table object from the dataframe """
+                                         cell_colors: Optional[np.ndarray] = None) -> Table:
+    """ Create a ReportLab table object from the dataframe, cell_colors is rows x channels from SiteReportData """
     # Adds to table data
     columns = [Paragraph(col, styles['table_headers']) for col in df.columns]
-    rows = format_df_rows(df, styles, channels)
+    rows = format_df_rows(df, styles, cell_colors)
 
     table_data = [columns] + rows
     table_style = [
@@ -248,7 +307,7 @@ def create_table_from_messages_dataframe(df: pd.DataFrame,
     """ Create a ReportLab table object from the dataframe """
     # Adds to table data
     columns = [Paragraph(col, styles['table_headers']) for col in df.columns]
-    rows = format_df_rows(df, styles, channels=None)
+    rows = format_df_rows(df, styles)
 
     table_data = [columns] + rows
     table_style = [
@@ -270,39 +329,65 @@ def create_table_from_messages_dataframe(df: pd.DataFrame,
 
 def format_df_rows(df: pd.DataFrame,
                    styles: dict,
-                   channels: Optional[List[Channel]]) -> List:
-    rows = []
-    for row_i, row in df.iterrows():
-        table_row = []
+                   cell_colors: Optional[np.ndarray] = None) -> List:
+    """
+    Paragraph per cell, built a column at a time
+    cell_colors holds the background of out of limit meter cells for the channel columns after the timestamp
+    """
+    columns = []
+    for col_i, column in enumerate(df.columns):
+        colors = None
+        if cell_colors is not None and 1 <= col_i <= cell_colors.shape[1]:
+            colors = cell_colors[:, col_i - 1]
+        columns.append(format_df_column(df[column], styles, colors))
+    return [list(row) for row in zip(*columns)]
+
+
+def format_df_column(values: pd.Series,
+                     styles: dict,
+                     colors: Optional[np.ndarray] = None) -> List[Paragraph]:
+    """ Cells of one column, a float column's styles are picked for the whole column before any cell is built """
+    if pd.api.types.is_float_dtype(values.dtype):
+        cell_styles = np.full(len(values), styles['table_data'], dtype=object)
+        if colors is not None:
+            out_of_limits = np.flatnonzero(pd.notna(colors))
+            cell_styles[out_of_limits] = [apply_bg_color(styles['table_data'], color)
+                                          for color in colors[out_of_limits]]
+        return [Paragraph(str(value), style) for value, style in zip(values.tolist(), cell_styles)]
+
+    # mixed columns, e.g. a meter with non-numeric input, fall back to checking each value
+    cells = []
+    for row_i, value in enumerate(values.tolist()):
         # apply styling to the cell depending on the value/value type
-        for val_i, value in enumerate(row.values):
-            if type(value) == float:
-                if val_i == 0 or val_i > len(channels):
-                    raise IndexError    # either more data before channels or timestamp flagged as float
-                meter_style = check_meter_limits_apply_bg_color(value, channels[val_i - 1], styles['table_data'])
-                cell = Paragraph(str(value), meter_style)
-            elif '*' in value:
-                value = '*'.join(value.split('*')[1:])
-                bullets = value.replace('*', '<br/>')
-                cell = Paragraph(bullets, styles['bullets'])
-            else:
-                cell = Paragraph(value, styles['table_data'])
-
-            table_row.append(cell)
-        rows.append(table_row)
-    return rows
-
-
-def check_meter_limits_apply_bg_color(meter_value: float,
-                                      channel: Channel,
-                                      cell_style: ParagraphStyle) -> ParagraphStyle:
-    if meter_value >= channel.meter_config[0].upper_limit:
-        meter_style = ParagraphStyle('above_upper', parent=cell_style, backColor=channel.meter_config[0].upper_lim_color)
-    elif meter_value <= channel.meter_config[0].lower_limit:
-        meter_style = ParagraphStyle('below_lower', parent=cell_style, backColor=channel.meter_config[0].lower_lim_color)
-    else:
-        meter_style = cell_style
-    return meter_style
+        if type(value) == float:
+            color = colors[row_i] if colors is not None else None
+            cell = Paragraph(str(value), apply_bg_color(styles['table_data'], color))
+        elif '*' in value:
+            value = '*'.join(value.split('*')[1:])
+            bullets = value.replace('*', '<br/>')
+            cell = Paragraph(bullets, styles['bullets'])
+        else:
+            cell = Paragraph(value, styles['table_data'])
+        cells.append(cell)
+    return cells
+
+
+# Interned cell styles with an excursion background, one per base style and color in the process
+_bg_color_styles: Dict[Tuple[str, str], ParagraphStyle] = {}
+
+
+def apply_bg_color(cell_style: ParagraphStyle,
+                   color: Optional[str]) -> ParagraphStyle:
+    """ Cell style with the excursion background color, unchanged if the value was within limits """
+    if not color:
+        return cell_style
+    key = (cell_style.name, color)
+    style = _bg_color_styles.get(key)
+    if style is None:
+        style = _bg_color_styles.setdefault(
+            key, ParagraphStyle(f'{cell_style.name}_{color}', parent=cell_style, backColor=color)
+        )
+    return style
 
 
 # ----- BUILD PDF PAGES -----
@@ -342,6 +427,46 @@ def build_report_for_date(report_data: dict,
     return report_for_date
 
 
+def build_summary_report(report_data: dict,
+                         site_data: SiteReportData) -> list:
+    """ Page of min, max, mean and limit counts for each meter channel over the date range """
+    title = report_data.get('title')
+    subheader = report_data.get('subheader')
+    styles = report_data.get('styles')
+
+    summaries = {summary.channel_id: summary for summary in site_data.summaries}
+    headers = ['Channel', 'Readings', 'Min', 'Max', 'Mean', 'Std Dev', 'At/Above Upper', 'At/Below Lower']
+    rows = []
+    table = site_data.table
+    for channel_id, channel_title, units in zip(table.channel_ids, table.titles, site_data.units):
+        summary = summaries.get(channel_id)
+        if not summary:
+            continue
+        rows.append([
+            channel_title,
+            str(summary.count),
+            f'{summary.minimum:.2f} {units}',
+            f'{summary.maximum:.2f} {units}',
+            f'{summary.mean:.2f} {units}',
+            f'{summary.std_dev:.2f}',
+            str(summary.above_upper),
+            str(summary.below_lower)
+        ])
+
+    summary_report = [
+        title,
+        subheader,
+        Paragraph('Meter Summary', styles['table_title']),
+    ]
+    if not rows:
+        summary_report.append(Paragraph('There were no meter readings in this date range', styles['foot_note']))
+        return summary_report
+
+    summary_df = pd.DataFrame.from_records(rows, columns=headers)
+    summary_report.append(create_table_from_messages_dataframe(summary_df, styles))
+    return summary_report
+
+
 def build_eas_report(site: Site,
                      date_range: Tuple[datetime, datetime]) -> List:
     """ Create a page in the report detailing the EAS test sent and received """
@@ -356,23 +481,19 @@ def create_eas_dataframe(eas_tests: List[EAS]) -> pd.DataFrame:
 
 
 # ----- BUILD HISTOGRAM OF VALUES OF DATERANGE -----
-def build_histogram(site: Site,
-                    date_range: Tuple[datetime, datetime]) -> Optional[Figure]:
-    """ Gather data and create histogram of meter readings over input dates range """
-    # get database data
-    readings_for_date_range = query_readings_by_date_range(date_range)
-    data_by_input_date_range = get_valid_readings(readings_for_date_range, site)
-    # if there is no data for the readings in the specified range, do not create histogram
-    if not data_by_input_date_range:
+def build_histogram(site_data: SiteReportData) -> Optional[Figure]:
+    """ Create histogram of meter readings over input dates range """
+    # readings pivoted to one row per reading, already fetched with the daily tables
+    reading_table = site_data.range_table()
+    # if there is no meter data for the readings in the specified range, do not create histogram
+    if not reading_table.rows or not reading_table.meter_indexes():
         return None
 
-    # create table of readings on specific date
-    headers = ['Timestamp'] + [channel.title for channel in site.channels] + ['MCEOD']
-    input_date_range_df = create_readings_dataframe(headers, data_by_input_date_range)
-    # remove_df_rows_w_no_data(input_date_range_df, headers[1:-1])
+    # Timestamp column and float meter columns, non-numeric meter values are NaN gaps in the plot
+    meter_df = create_meter_dataframe(reading_table)
 
     # headers does not include Timestamp as Timestamp is x axis reading.
-    histogram = create_histogram_of_readings(input_date_range_df, date_range, headers[1:-1])
+    histogram = create_histogram_of_readings(meter_df, site_data.date_range, list(meter_df.columns[1:]))
     return histogram
 
 
@@ -0,0 +1,168 @@
+"""
+Disk cache of rendered PDF reports
+A report's key covers the site, date range, the site's channel config version, a version of the site's data in
+range and the names of the users who signed its readings, so a new or removed reading or message, any channel config
+change, or a renamed or deleted user gives a new key
+Stale files are never read again and age out with least recently used eviction once the cache is over its size
+"""
+# ----- 3RD PARTY IMPORTS -----
+from sqlalchemy import func, select
+# ----- BUILT IN IMPORTS -----
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import Message, Reading, Site, SiteReading, User
+from utils.reading_pivot import user_name_column
+from utils.site_runtime import site_config_version
+from utils.tasks.report_data import report_days
+
+# Bytes of PDFs kept on disk, overridden by FLASK_REPORT_CACHE_MAX_BYTES, 0 disables the cache
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ReportCache:
+    """
+    One file per report named by its key, a hit touches the file so modification time orders eviction
+    Files are written to a temporary name and renamed so readers never see a partial report
+    """
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict, instance_path: str) -> None:
+        """ Load directory and size from app config, FLASK_REPORT_CACHE_DIR defaults to instance/report_cache """
+        self.directory = config.get('REPORT_CACHE_DIR') or os.path.join(instance_path, 'report_cache')
+        self.max_bytes = int(config.get('REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        return
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """ Cached report, None on a miss """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """ Store a report then evict the least recently used ones past max_bytes """
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = os.path.join(self.directory, f'.{uuid.uuid4().hex}.tmp')
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, self._path(key))
+        self.evict()
+        return
+
+    def evict(self) -> int:
+        """ Delete oldest reports until the cache fits in max_bytes, returns files deleted """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            deleted = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                deleted += 1
+        return deleted
+
+    def clear(self) -> None:
+        """ Delete every cached report """
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pdf'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        return
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.pdf')
+
+
+def report_cache_key(site: Site, date_range: Tuple[datetime, datetime]) -> str:
+    """ Digest of everything the report's content depends on """
+    key = dict(
+        site_id=site.id,
+        date_range=[date.isoformat() for date in date_range],
+        config_version=site_config_version(site),
+        data_version=query_data_version(site, report_days(date_range)),
+        users=query_user_names(site, report_days(date_range))
+    )
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def query_data_version(site: Site, days: Tuple[datetime, datetime]) -> list:
+    """
+    Count, sum and max of the ids of the site's readings and messages in range
+    Readings and messages are only ever added or deleted so any change moves at least one of them
+    """
+    in_range = (
+        SiteReading.site_id == site.id,
+        SiteReading.timestamp >= days[0],
+        SiteReading.timestamp <= days[1]
+    )
+    readings = db.session.execute(
+        select(func.count(), func.sum(SiteReading.reading_id), func.max(SiteReading.reading_id)).where(*in_range)
+    ).one()
+    messages = db.session.execute(
+        select(func.count(), func.sum(Message.id), func.max(Message.id)).join(
+            SiteReading, (SiteReading.reading_id == Message.reading_id) & (SiteReading.site_id == Message.site_id)
+        ).where(*in_range)
+    ).one()
+    return list(readings) + list(messages)
+
+
+def query_user_names(site: Site, days: Tuple[datetime, datetime]) -> list:
+    """ [user_id, name] of each user who signed one of the site's readings in range, as the report prints the name """
+    rows = db.session.execute(
+        select(Reading.user_id, user_name_column()).select_from(
+            SiteReading
+        ).join(
+            Reading, Reading.id == SiteReading.reading_id
+        ).outerjoin(
+            User, User.id == Reading.user_id
+        ).where(
+            SiteReading.site_id == site.id,
+            SiteReading.timestamp >= days[0],
+            SiteReading.timestamp <= days[1]
+        ).distinct().order_by(Reading.user_id)
+    )
+    return [list(row) for row in rows]
+
+
+# Shared by every request in the process
+report_cache = ReportCache()
@@ -0,0 +1,242 @@
+"""
+Data of a site's PDF report gathered with one fetch per source for the whole date range
+Daily tables, message pages, the summary page and the chart all read from the same SiteReportData
+Batches of reports fetch every site's data with the same number of queries as a single site
+"""
+# ----- 3RD PARTY IMPORTS -----
+import numpy as np
+from sqlalchemy import select
+# ----- BUILT IN IMPORTS -----
+from dataclasses import dataclass
+from functools import cached_property
+from datetime import datetime
+from typing import Dict, List, Tuple
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import Channel, LimitExcursion, Message, MeterConfig, Reading, ReadingValue, Site, SiteReading, User
+from utils.datetime_manipulation import create_list_of_individual_dates
+from utils.excursions import query_site_excursions
+from utils.reading_pivot import ID, ReadingTable, query_reading_table, user_name_column
+from utils.rollups import RollupSummary, query_rollup_summaries, query_sites_rollup_summaries
+from utils.validate_readings import load_site_messages
+
+
+@dataclass
+class SiteReportData:
+    """
+    Plain values only so a report's data can be pickled or cached
+    table holds whole days from the first to the last report date, oldest reading first
+    units lines up with the table's channels, '' for status channels
+    """
+    site_id: int
+    site_name: str
+    date_range: Tuple[datetime, datetime]
+    dates: List[datetime]
+    table: ReadingTable
+    units: Tuple[str, ...]
+    messages: Dict[int, List[str]]
+    excursion_colors: Dict[Tuple[int, int], str]
+    summaries: List[RollupSummary]
+
+    def day_table(self, date: datetime) -> ReadingTable:
+        """ Readings from 00:00:00 to 23:59:59.999999 of the date """
+        return self.table.between(datetime.combine(date, datetime.min.time()),
+                                  datetime.combine(date, datetime.max.time()))
+
+    def range_table(self) -> ReadingTable:
+        """ Readings inside the exact date range """
+        return self.table.between(*self.date_range)
+
+    def cell_colors(self, table: ReadingTable) -> np.ndarray:
+        """
+        rows x channels array of the excursion color of each of the table's cells, None within limits
+        Excursions are placed with one vectorized lookup of their reading and channel positions
+        """
+        colors = np.full((len(table.rows), len(table.channel_ids)), None, dtype=object)
+        reading_ids, channel_ids, excursion_colors = self._excursion_arrays
+        if not table.rows or not len(reading_ids):
+            return colors
+
+        rows = np.array(table.column(ID), dtype=np.int64)
+        channels = np.array(table.channel_ids, dtype=np.int64)
+        in_table = np.isin(reading_ids, rows) & np.isin(channel_ids, channels)
+        if not in_table.any():
+            return colors
+
+        row_order = np.argsort(rows)
+        channel_order = np.argsort(channels)
+        row_i = row_order[np.searchsorted(rows, reading_ids[in_table], sorter=row_order)]
+        channel_i = channel_order[np.searchsorted(channels, channel_ids[in_table], sorter=channel_order)]
+        colors[row_i, channel_i] = excursion_colors[in_table]
+        return colors
+
+    @cached_property
+    def _excursion_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ (reading ids, channel ids, colors) of every excursion in the report, built once per report """
+        count = len(self.excursion_colors)
+        reading_ids = np.fromiter((key[0] for key in self.excursion_colors), dtype=np.int64, count=count)
+        channel_ids = np.fromiter((key[1] for key in self.excursion_colors), dtype=np.int64, count=count)
+        colors = np.empty(count, dtype=object)
+        colors[:] = list(self.excursion_colors.values())
+        return reading_ids, channel_ids, colors
+
+
+def gather_report_data(site: Site, date_range: Tuple[datetime, datetime]) -> SiteReportData:
+    """ Fetch everything the report shows, one query per source over whole days covering the range """
+    days = report_days(date_range)
+    table = query_reading_table(site, days)
+    reading_ids = [row[ID] for row in table.rows]
+    excursion_colors = {
+        (excursion.reading_id, excursion.channel_id): excursion.color
+        for excursion in query_site_excursions(site, days)
+    }
+
+    return SiteReportData(
+        site_id=site.id,
+        site_name=site.site_name,
+        date_range=date_range,
+        dates=create_list_of_individual_dates(*date_range),
+        table=table,
+        units=load_channel_units(table.channel_ids),
+        messages=load_site_messages(reading_ids, site.id),
+        excursion_colors=excursion_colors,
+        summaries=query_rollup_summaries(site, date_range)
+    )
+
+
+def gather_sites_report_data(sites: List[Site],
+                             date_range: Tuple[datetime, datetime]) -> List[SiteReportData]:
+    """
+    gather_report_data for many sites from one query per source shared by every site
+    Readings are read as (site, reading, channel) rows and pivoted here instead of once per site in SQL
+    """
+    days = report_days(date_range)
+    dates = create_list_of_individual_dates(*date_range)
+    site_ids = [site.id for site in sites]
+
+    channels: Dict[int, List[Tuple[int, str, str]]] = {site_id: [] for site_id in site_ids}
+    for channel_id, site_id, title, chan_type in Channel.query.with_entities(
+        Channel.id, Channel.site_id, Channel.title, Channel.chan_type
+    ).filter(Channel.site_id.in_(site_ids)).order_by(Channel.id):
+        channels[site_id].append((channel_id, title, chan_type))
+
+    tables = {}
+    for site_id, site_channels in channels.items():
+        tables[site_id] = ReadingTable(
+            channel_ids=tuple(channel_id for channel_id, _, _ in site_channels),
+            titles=tuple(title for _, title, _ in site_channels),
+            chan_types=tuple(chan_type for _, _, chan_type in site_channels),
+            rows=[]
+        )
+    for site_id, rows in query_sites_reading_rows(site_ids, days, tables).items():
+        tables[site_id].rows = rows
+
+    messages: Dict[int, Dict[int, List[str]]] = {site_id: {} for site_id in site_ids}
+    for site_id, reading_id, message in db.session.execute(
+        select(Message.site_id, Message.reading_id, Message.message).join(
+            SiteReading, (SiteReading.reading_id == Message.reading_id) & (SiteReading.site_id == Message.site_id)
+        ).where(
+            SiteReading.site_id.in_(site_ids),
+            SiteReading.timestamp >= days[0],
+            SiteReading.timestamp <= days[1]
+        ).order_by(Message.id)
+    ):
+        messages[site_id].setdefault(reading_id, []).append(message)
+
+    excursion_colors: Dict[int, Dict[Tuple[int, int], str]] = {site_id: {} for site_id in site_ids}
+    for site_id, reading_id, channel_id, color in db.session.execute(
+        select(LimitExcursion.site_id, LimitExcursion.reading_id, LimitExcursion.channel_id, LimitExcursion.color).where(
+            LimitExcursion.site_id.in_(site_ids),
+            LimitExcursion.timestamp >= days[0],
+            LimitExcursion.timestamp <= days[1]
+        )
+    ):
+        excursion_colors[site_id][reading_id, channel_id] = color
+
+    all_channel_ids = tuple(channel_id for site_channels in channels.values() for channel_id, _, _ in site_channels)
+    units = dict(zip(all_channel_ids, load_channel_units(all_channel_ids)))
+    summaries = query_sites_rollup_summaries(site_ids, date_range)
+
+    return [
+        SiteReportData(
+            site_id=site.id,
+            site_name=site.site_name,
+            date_range=date_range,
+            dates=list(dates),
+            table=tables[site.id],
+            units=tuple(units[channel_id] for channel_id in tables[site.id].channel_ids),
+            messages=messages[site.id],
+            excursion_colors=excursion_colors[site.id],
+            summaries=summaries.get(site.id, [])
+        )
+        for site in sites
+    ]
+
+
+def query_sites_reading_rows(site_ids: List[int],
+                             days: Tuple[datetime, datetime],
+                             tables: Dict[int, ReadingTable]) -> Dict[int, List[tuple]]:
+    """ {site_id: rows} laid out like query_reading_table rows, oldest reading first """
+    statement = select(
+        SiteReading.site_id, Reading.id, Reading.timestamp, user_name_column(), Reading.notes,
+        ReadingValue.channel_id, ReadingValue.reading_value, ReadingValue.numeric_value
+    ).select_from(
+        SiteReading
+    ).join(
+        Reading, Reading.id == SiteReading.reading_id
+    ).join(
+        ReadingValue, ReadingValue.reading_id == SiteReading.reading_id
+    ).join(
+        Channel, (Channel.id == ReadingValue.channel_id) & (Channel.site_id == SiteReading.site_id)
+    ).outerjoin(
+        User, User.id == Reading.user_id
+    ).where(
+        SiteReading.site_id.in_(site_ids),
+        SiteReading.timestamp >= days[0],
+        SiteReading.timestamp <= days[1]
+    ).order_by(
+        SiteReading.site_id, SiteReading.timestamp, SiteReading.reading_id
+    )
+
+    rows: Dict[int, List[tuple]] = {}
+    current = None
+    for site_id, reading_id, timestamp, user, notes, channel_id, value, number in db.session.execute(statement):
+        if current is None or current[0] != site_id or current[1] != reading_id:
+            if current is not None:
+                rows.setdefault(current[0], []).append(pivot_row(*current))
+            table = tables[site_id]
+            current = (site_id, reading_id, timestamp, user, notes, table.channel_ids, {}, {})
+        current[6][channel_id] = value
+        current[7][channel_id] = number
+    if current is not None:
+        rows.setdefault(current[0], []).append(pivot_row(*current))
+    return rows
+
+
+def pivot_row(site_id, reading_id, timestamp, user, notes, channel_ids, values, numbers) -> tuple:
+    """ One reading's row: leading columns, a value per channel then a number per channel """
+    return (
+        (reading_id, timestamp, user, notes)
+        + tuple(values.get(channel_id) for channel_id in channel_ids)
+        + tuple(numbers.get(channel_id) for channel_id in channel_ids)
+    )
+
+
+def report_days(date_range: Tuple[datetime, datetime]) -> Tuple[datetime, datetime]:
+    """ Start of the first report date to the end of the last, the daily tables always show whole days """
+    dates = create_list_of_individual_dates(*date_range)
+    if not dates:
+        return date_range
+    return datetime.combine(dates[0], datetime.min.time()), datetime.combine(dates[-1], datetime.max.time())
+
+
+def load_channel_units(channel_ids: Tuple[int, ...]) -> Tuple[str, ...]:
+    """ Units of each channel's first meter config in channel order """
+    units = {}
+    rows = MeterConfig.query.with_entities(MeterConfig.channel_id, MeterConfig.units).filter(
+        MeterConfig.channel_id.in_(channel_ids)
+    ).order_by(MeterConfig.id.desc())
+    # ordered newest first so the first config of each channel is written last
+    for channel_id, channel_units in rows:
+        units[channel_id] = channel_units or ''
+    return tuple(units.get(channel_id, '') for channel_id in channel_ids)
@@ -0,0 +1,248 @@
+"""
+Background PDF report jobs
+The request gathers the report's data from the database, then a pool of worker processes lays out and renders the
+PDF so ReportLab and matplotlib never hold a web server thread. Workers write progress and the finished PDF to the
+jobs directory, finished jobs are deleted once they expire
+Job records live in the web process, polling must reach the process that accepted the job
+"""
+# ----- BUILT IN IMPORTS -----
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from models import Site
+from utils.tasks.report_cache import report_cache, report_cache_key
+from utils.tasks.report_data import SiteReportData, gather_report_data
+
+# Overridden by FLASK_REPORT_WORKERS, FLASK_REPORT_MAX_JOBS and FLASK_REPORT_JOB_TTL
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_JOBS = 16       # queued and running jobs accepted at once
+DEFAULT_JOB_TTL = 3600.0    # seconds a finished PDF can be downloaded
+
+
+class JobQueueFull(Exception):
+    """ Raised when max_jobs reports are already queued or rendering """
+
+
+@dataclass
+class ReportJob:
+    """ A report request, future is None when the PDF came from the report cache """
+    id: str
+    site_id: int
+    date_range: Tuple[datetime, datetime]
+    filename: str
+    days_total: int
+    cache_key: str
+    future: Optional[Future] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def status(self) -> str:
+        """ queued, running, done or failed """
+        if self.error:
+            return 'failed'
+        if self.finished_at is not None:
+            return 'done'
+        if self.future is not None and self.future.running():
+            return 'running'
+        return 'queued'
+
+
+class ReportJobs:
+    """ Process pool rendering reports, created on the first submitted job """
+    def __init__(self, directory: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                 max_jobs: int = DEFAULT_MAX_JOBS, ttl: float = DEFAULT_JOB_TTL):
+        self.directory = directory
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: Dict[str, ReportJob] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def configure(self, config: dict, instance_path: str) -> None:
+        """ Load settings from app config, FLASK_REPORT_JOB_DIR defaults to instance/report_jobs """
+        self.directory = config.get('REPORT_JOB_DIR') or os.path.join(instance_path, 'report_jobs')
+        self.workers = int(config.get('REPORT_WORKERS', DEFAULT_WORKERS))
+        self.max_jobs = int(config.get('REPORT_MAX_JOBS', DEFAULT_MAX_JOBS))
+        self.ttl = float(config.get('REPORT_JOB_TTL', DEFAULT_JOB_TTL))
+        return
+
+    def submit(self, site: Site, date_range: Tuple[datetime, datetime], filename: str) -> ReportJob:
+        """ Queue a report, served straight from the report cache when nothing in it changed """
+        self.expire()
+        os.makedirs(self.directory, exist_ok=True)
+        cache_key = report_cache_key(site, date_range)
+        cached = report_cache.get(cache_key)
+
+        with self._lock:
+            active = sum(job.finished_at is None for job in self._jobs.values())
+            if cached is None and active >= self.max_jobs:
+                raise JobQueueFull(f'{active} reports are already being generated, try again shortly')
+            job = ReportJob(id=uuid.uuid4().hex, site_id=site.id, date_range=date_range, filename=filename,
+                            days_total=0, cache_key=cache_key)
+            self._jobs[job.id] = job
+
+        if cached is not None:
+            write_atomic(self.pdf_path(job.id), cached)
+            job.finished_at = time.monotonic()
+            return job
+
+        try:
+            site_data = gather_report_data(site, date_range)
+            job.days_total = len(site_data.dates)
+            pool = self._submit(job, site_data)
+        except Exception:
+            self._discard(job.id)
+            raise
+        job.future.add_done_callback(lambda future: self._finish(job, future, pool))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """ Job by id, None if unknown or expired """
+        self.expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def progress(self, job: ReportJob) -> dict:
+        """ Status of the job with the progress its worker last wrote """
+        progress = dict(days_rendered=0, chart_done=False)
+        if job.status == 'done':
+            progress = dict(days_rendered=job.days_total, chart_done=True)
+        else:
+            try:
+                with open(self.progress_path(job.id)) as file:
+                    progress.update(json.load(file))
+            except (FileNotFoundError, ValueError):
+                pass
+
+        expires_in = None
+        if job.finished_at is not None:
+            expires_in = max(0, round(self.ttl - (time.monotonic() - job.finished_at)))
+        return dict(id=job.id, site_id=job.site_id, status=job.status, days_total=job.days_total,
+                    error=job.error, expires_in=expires_in, **progress)
+
+    def pdf_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.pdf')
+
+    def progress_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def expire(self) -> int:
+        """ Drop finished jobs older than ttl and delete their files, including files left by earlier runs """
+        now = time.monotonic()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and now - job.finished_at > self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
+            live = set(self._jobs)
+
+        if not self.directory or not os.path.isdir(self.directory):
+            return len(expired)
+        wall_now = time.time()
+        for entry in os.scandir(self.directory):
+            job_id = entry.name.split('.')[0]
+            try:
+                if job_id in expired or (job_id not in live and wall_now - entry.stat().st_mtime > self.ttl):
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        return len(expired)
+
+    def shutdown(self) -> None:
+        """ Stop the worker processes, queued jobs are cancelled """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawned workers do not inherit the web process's threads, sockets or database connections
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _submit(self, job: ReportJob, site_data: SiteReportData) -> ProcessPoolExecutor:
+        """ Hand the job to the pool, retried once on a fresh pool if a worker died since the last job """
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                job.future = pool.submit(render_report, site_data, self.pdf_path(job.id), self.progress_path(job.id))
+                return pool
+            except BrokenProcessPool:
+                self._reset_pool(pool)
+                if attempt:
+                    raise
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """ Drop a broken pool so the next job starts a fresh one, unless it was already replaced """
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    def _discard(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return
+
+    def _finish(self, job: ReportJob, future: Future, pool: ProcessPoolExecutor) -> None:
+        """ Record the result, finished PDFs are also added to the report cache """
+        try:
+            future.result()
+            with open(self.pdf_path(job.id), 'rb') as file:
+                report_cache.put(job.cache_key, file.read())
+        except BrokenProcessPool as err:
+            # a worker was killed (out of memory or a crash in matplotlib), every later submit to this pool would fail
+            job.error = str(err) or type(err).__name__
+            self._reset_pool(pool)
+        except Exception as err:
+            job.error = str(err) or type(err).__name__
+        job.finished_at = time.monotonic()
+        try:
+            os.remove(self.progress_path(job.id))
+        except FileNotFoundError:
+            pass
+        return
+
+
+def render_report(site_data: SiteReportData, pdf_path: str, progress_path: str) -> None:
+    """ Runs in a worker process, needs no app or database """
+    from utils.tasks.pdf_generation import build_pdf
+    state = dict(days_rendered=0, chart_done=False)
+
+    def progress(**update):
+        state.update(update)
+        write_atomic(progress_path, json.dumps(state).encode('utf-8'))
+
+    write_atomic(pdf_path, build_pdf(site_data, progress))
+    return
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """ Write to a temporary name then rename so readers never see a partial file """
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+    return
+
+
+# Shared by every request in the process
+report_jobs = ReportJobs()
@@ -0,0 +1,89 @@
+"""
+Background sampler that polls every site's Burk unit on an interval
+Stores meter channel values in the meter_samples table for trending without operator input
+"""
+# ----- 3RD PARTY IMPORTS -----
+from flask import Flask
+# ----- BUILT IN IMPORTS -----
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+# ----- PROJECT IMPORTS -----
+from extensions import db
+from models import MeterSample
+from utils.burk_polling import collect_snapshots
+from utils.site_runtime import get_all_site_runtimes
+
+
+class TelemetrySampler:
+    """ Daemon thread polling all sites every interval seconds, web requests never wait on it """
+    def __init__(self, app: Flask, interval: float, jitter: float):
+        self.app = app
+        self.interval = interval
+        self.jitter = min(jitter, interval / 2)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='telemetry-sampler', daemon=True)
+        self._thread.start()
+        return
+
+    def stop(self) -> None:
+        self._stop.set()
+        return
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                samples = self.sample_once()
+                self.app.logger.debug(f'Telemetry sampler stored {samples} meter samples')
+            except Exception as e:
+                self.app.logger.error(f'Telemetry sampler failed: {e}')
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
+        return
+
+    def sample_once(self) -> int:
+        """ Poll every site once and batch insert the meter values, returns number of rows stored """
+        timestamp = datetime.now()
+        with self.app.app_context():
+            sites = get_all_site_runtimes()
+            snapshots = collect_snapshots(sites, refresh=True, jitter=self.jitter)
+
+            rows = []
+            for site in sites:
+                snapshot = snapshots[site.id]
+                if snapshot.connected:
+                    rows += build_sample_rows(site.meter_channels(), snapshot.meters, timestamp)
+
+            if rows:
+                db.session.execute(db.insert(MeterSample), rows)
+                db.session.commit()
+        return len(rows)
+
+
+def build_sample_rows(meter_channels: List[Tuple[int, int]], meters: List[dict], timestamp: datetime) -> List[dict]:
+    """ Match Burk meter values to channels, skipping any that are missing or not numeric """
+    rows = []
+    for channel_id, burk_channel in meter_channels:
+        try:
+            value = float(meters[burk_channel - 1]['value'])
+        except (IndexError, KeyError, TypeError, ValueError):
+            continue
+        rows.append(dict(channel_id=channel_id, timestamp=timestamp, value=value))
+    return rows
+
+
+def start_telemetry_sampler(app: Flask) -> Optional[TelemetrySampler]:
+    """ Start sampling if FLASK_TELEMETRY_INTERVAL is set, FLASK_TELEMETRY_JITTER spreads the calls """
+    interval = float(app.config.get('TELEMETRY_INTERVAL', 0))
+    if interval <= 0:
+        return None
+    jitter = float(app.config.get('TELEMETRY_JITTER', interval / 4))
+
+    sampler = TelemetrySampler(app, interval, jitter)
+    sampler.start()
+    app.extensions['telemetry_sampler'] = sampler
+    return sampler
@@ -1,48 +1,108 @@
 """ Returns reading data if there was value data for the site on the queried date """
 # ----- IMPORTS -----
-from typing import List, Optional
+import math
+from typing import Dict, Iterator, List, Optional
 
 from models import Message, Reading, ReadingValue, Site, User
 
+# Ids per IN clause, keeps queries under SQLite's bound parameter limit
+IN_CLAUSE_CHUNK = 500
+
 
 def get_valid_readings(readings: List[Reading], site: Site) -> List[dict]:
-    """ Returns non-null readings data from gather_reading_data """
+    """ Returns non-null readings data from gather_readings_data """
+    # only return output if there is valid data in the channel_values list
+    return [reading_data for reading_data in gather_readings_data(readings, site) if reading_data['reading_values']]
+
+
+def gather_reading_data(reading: Reading, site: Site) -> dict:
+    """ Gather readings data associated to specific site """
+    return gather_readings_data([reading], site)[0]
+
+
+def gather_readings_data(readings: List[Reading], site: Site) -> List[dict]:
+    """
+    Gather readings data associated to specific site for many readings at once
+    Values, users and messages are each loaded with one query per IN_CLAUSE_CHUNK readings
+    """
+    if not readings:
+        return []
+    reading_ids = [reading.id for reading in readings]
+    channel_ids = [channel.id for channel in site.channels]
+
+    values = load_reading_values(reading_ids, channel_ids)
+    user_names = load_user_names({reading.user_id for reading in readings})
+    messages = load_site_messages(reading_ids, site.id)
+
     output_data = []
     for reading in readings:
-        reading_data = gather_reading_data(reading, site)
-        # only return output if there is valid data in the channel_values list
-        if reading_data['reading_values']:
-            output_data.append(reading_data)
+        # Create dict
+        reading_data = reading.to_dict()
+
+        # returns empty list if no value in the ReadingValue for the reading
+        reading_values = values.get(reading.id, {})
+        reading_data['reading_values'] = check_list([reading_values.get(channel_id) for channel_id in channel_ids])
+
+        # Add name of User to reading_data
+        reading_data['user'] = user_names.get(reading.user_id, '[DELETED]')
+
+        # Add any messages associated to site from current reading
+        reading_data['messages'] = messages.get(reading.id, [])
+        output_data.append(reading_data)
     return output_data
 
 
-def gather_reading_data(reading: Reading, site: Site) -> dict:
-    """ Gather readings data associated to specific site """
-    # Create dict
-    reading_data = reading.to_dict()
+def load_reading_values(reading_ids: List[int], channel_ids: List[int]) -> Dict[int, Dict[int, str]]:
+    """ {reading_id: {channel_id: value}} for the given readings and channels """
+    values = {}
+    if not channel_ids:
+        return values
+    for ids in chunk(reading_ids):
+        rows = ReadingValue.query.with_entities(
+            ReadingValue.reading_id, ReadingValue.channel_id, ReadingValue.reading_value
+        ).filter(
+            ReadingValue.reading_id.in_(ids),
+            ReadingValue.channel_id.in_(channel_ids)
+        )
+        for reading_id, channel_id, reading_value in rows:
+            values.setdefault(reading_id, {})[channel_id] = reading_value
+    return values
+
 
-    # Add the values for each channel to the reading_data
-    values = []
-    for channel in site.channels:
-        values.append(ReadingValue.query.filter_by(channel_id=channel.id, reading_id=reading.id).first())
+def load_user_names(user_ids: set) -> Dict[int, str]:
+    """ {user_id: name} for users that still exist """
+    names = {}
+    for ids in chunk(list(user_ids)):
+        for user in User.query.filter(User.id.in_(ids)):
+            names[user.id] = user.name
+    return names
 
-    # returns empty list if no value in the ReadingValue for the reading
-    reading_values = []
-    for value in values:
-        reading_value = value.reading_value if value else None
-        reading_values.append(reading_value)
 
-    reading_data['reading_values'] = check_list(reading_values)
+def load_site_messages(reading_ids: List[int], site_id: int) -> Dict[int, List[str]]:
+    """ {reading_id: [message, ...]} of a site's auto-generated messages """
+    messages = {}
+    for ids in chunk(reading_ids):
+        rows = Message.query.with_entities(Message.reading_id, Message.message).filter(
+            Message.site_id == site_id,
+            Message.reading_id.in_(ids)
+        ).order_by(Message.id)
+        for reading_id, message in rows:
+            messages.setdefault(reading_id, []).append(message)
+    return messages
 
-    # Add name of User to reading_data
-    user = User.query.get(reading.user_id)
-    reading_data['user'] = user.name if user else '[DELETED]'
 
-    # Add any messages associated to site from current reading
-    messages = Message.query.filter_by(site_id=site.id, reading_id=reading.id).all()
-    reading_data['messages'] = list([message.message for message in messages])
+def chunk(ids: List[int], size: int = IN_CLAUSE_CHUNK) -> Iterator[List[int]]:
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
 
-    return reading_data
+
+def to_numeric(value: Optional[str]) -> Optional[float]:
+    """ Submitted meter value as a float, None if it is not a finite number """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
 
 
 def check_list(input_list: list) -> Optional[List]: